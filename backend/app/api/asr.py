@@ -1,11 +1,8 @@
 import base64
-import io
 import json
-import wave
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional, Union
 
-import httpx
-from fastapi import APIRouter, File, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, File, HTTPException, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
 
 from app.api.engine_schemas import (
     EngineDefaultResponse,
@@ -16,25 +13,18 @@ from app.api.engine_schemas import (
     EngineRunRequest,
     HealthResponse,
 )
+from app.core.settings import get_settings
+from app.services.asr_cache import StreamDigest, audio_digest, digest_chunks, get_asr_cache
+from app.services.asr_stream import ASRStreamSession, RealtimeASRSession
+from app.services.asr_window import SlidingWindow
+from app.services.audio_buffer import PCMBuffer
 from app.services.engines import registry, runtime_store
 from app.services.engines.health import check_engine_health
-from app.core.http_utils import normalize_path, resolve_api_key, sanitize_config
+from app.services.providers import asr as asr_provider
+from app.services.providers.asr import ASRConfigError, AudioPayload, AudioStream
+from app.services.vad import EnergyVAD
 
 router = APIRouter(prefix="/asr", tags=["asr"])
-ASR_BLOCKED_CONFIG_KEYS = frozenset(
-    {
-        "api_key",
-        "apiKey",
-        "base_url",
-        "baseUrl",
-        "engine",
-        "filename",
-        "file_name",
-        "file",
-        "content_type",
-        "mime_type",
-    }
-)
 
 
 @router.get("/engines", response_model=EngineListResponse)
@@ -64,8 +54,13 @@ async def get_asr_engine_health(engine: str) -> HealthResponse:
     return HealthResponse(**await check_engine_health(config))
 
 
+@router.get("/cache/stats")
+async def get_asr_cache_stats() -> dict:
+    return get_asr_cache().stats()
+
+
 @router.post("/engines")
-async def run_asr_engine(request: EngineRunRequest) -> dict:
+async def run_asr_engine(request: EngineRunRequest, response: Response) -> dict:
     engine_id = _resolve_engine_id(request.engine)
     config = _get_engine_config(engine_id)
     audio_bytes = _extract_audio_bytes(request.data)
@@ -73,48 +68,62 @@ async def run_asr_engine(request: EngineRunRequest) -> dict:
         raise HTTPException(status_code=400, detail="Missing audio data")
     overrides = request.config if isinstance(request.config, dict) else {}
     filename, content_type = _resolve_file_meta(overrides)
-    engine_type = (config.engine_type or "openai_compat").lower()
-    if engine_type in {"dify_asr", "dify"}:
-        return await _forward_dify_transcription(config, audio_bytes, overrides, filename, content_type)
-    if engine_type in {"coze_asr", "coze"}:
-        return await _forward_coze_transcription(config, audio_bytes, overrides, filename, content_type)
-    response = await _forward_transcription(config, audio_bytes, overrides, filename, content_type)
-    return response
+    digest = audio_digest(audio_bytes) if get_asr_cache().accepts(len(audio_bytes)) else None
+    return await _transcribe(
+        config, audio_bytes, overrides, filename, content_type, response=response, digest=digest
+    )
 
 
 @router.post("/engines/file")
 async def run_asr_engine_file(
+    response: Response,
     file: UploadFile = File(...),
     engine: str = "default",
 ) -> dict:
     engine_id = _resolve_engine_id(engine)
     config = _get_engine_config(engine_id)
-    audio_bytes = await file.read()
+    # Starlette has already spooled the upload, so hashing it first costs a re-read, not memory.
+    digest = await digest_chunks(_iter_upload(file)) if get_asr_cache().accepts(file.size) else None
     filename = file.filename or "audio.wav"
     content_type = file.content_type or "application/octet-stream"
-    engine_type = (config.engine_type or "openai_compat").lower()
-    if engine_type in {"dify_asr", "dify"}:
-        return await _forward_dify_transcription(config, audio_bytes, {}, filename, content_type)
-    if engine_type in {"coze_asr", "coze"}:
-        return await _forward_coze_transcription(config, audio_bytes, {}, filename, content_type)
-    response = await _forward_transcription(config, audio_bytes, {}, filename, content_type)
-    return response
+    return await _transcribe_stream(
+        config, _iter_upload(file), file.size, {}, filename, content_type, response=response, digest=digest
+    )
+
+
+@router.post("/engines/raw")
+async def run_asr_engine_raw(
+    request: Request,
+    response: Response,
+    engine: str = "default",
+    filename: str = "audio.wav",
+    content_type: Optional[str] = None,
+    config: Optional[str] = None,
+) -> dict:
+    engine_id = _resolve_engine_id(engine)
+    engine_config = _get_engine_config(engine_id)
+    overrides = _parse_config_param(config)
+    size = _content_length(request)
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Missing audio data")
+    body_type = request.headers.get("content-type", "").split(";")[0].strip()
+    content_type = content_type or body_type or "application/octet-stream"
+    return await _transcribe_stream(
+        engine_config, request.stream(), size, overrides, filename, content_type, response=response
+    )
 
 
 @router.websocket("/engines/stream")
 async def run_asr_engine_stream(websocket: WebSocket) -> None:
     await websocket.accept()
 
-    engine_id = "default"
-    engine_config = None
-    overrides: Dict[str, Any] = {}
-    sample_rate = 16000
-    channels = 1
-    buffer = bytearray()
+    session: Optional[Union[ASRStreamSession, RealtimeASRSession]] = None
 
     try:
         while True:
             message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
 
             if message.get("text") is not None:
                 try:
@@ -125,74 +134,195 @@ async def run_asr_engine_stream(websocket: WebSocket) -> None:
 
                 message_type = payload.get("type")
                 if message_type == "start":
-                    engine_id = payload.get("engine", "default")
-                    engine_id = _resolve_engine_id(engine_id)
-                    engine_config = _get_engine_config(engine_id)
-                    overrides = payload.get("config") if isinstance(payload.get("config"), dict) else {}
-                    sample_rate = int(payload.get("sample_rate") or payload.get("sampleRate") or 16000)
-                    channels = int(payload.get("channels") or 1)
-                    buffer = bytearray()
-                    await websocket.send_json({"type": "ready"})
+                    if session is not None:
+                        await session.close()
+                    session = _create_stream_session(websocket, payload)
+                    session.send_json({"type": "ready"})
                 elif message_type == "stop":
-                    if engine_config is None:
+                    if session is None:
                         await websocket.send_json({"type": "error", "error": "Engine not initialized."})
                         continue
-                    if not buffer:
-                        await websocket.send_json({"type": "error", "error": "Missing audio data."})
-                        continue
-
-                    wav_bytes = _encode_wav_pcm16(bytes(buffer), sample_rate, channels)
-                    filename = overrides.get("filename") or "audio.wav"
-                    content_type = overrides.get("content_type") or "audio/wav"
-
-                    engine_type = (engine_config.engine_type or "openai_compat").lower()
-                    if engine_type in {"dify_asr", "dify"}:
-                        response = await _forward_dify_transcription(
-                            engine_config, wav_bytes, overrides, filename, content_type
-                        )
-                    elif engine_type in {"coze_asr", "coze"}:
-                        response = await _forward_coze_transcription(
-                            engine_config, wav_bytes, overrides, filename, content_type
-                        )
-                    else:
-                        response = await _forward_transcription(
-                            engine_config, wav_bytes, overrides, filename, content_type
-                        )
-
-                    await websocket.send_json({"type": "result", "data": response})
-                    buffer = bytearray()
+                    await session.stop()
                 elif message_type == "reset":
-                    buffer = bytearray()
+                    if session is not None:
+                        await session.reset()
                 else:
                     await websocket.send_json({"type": "error", "error": "Unknown message type."})
 
-            elif message.get("bytes") is not None:
-                buffer.extend(message["bytes"])
+            elif message.get("bytes") is not None and session is not None:
+                await session.feed(message["bytes"])
 
     except WebSocketDisconnect:
         return
     except Exception as exc:
         await websocket.send_json({"type": "error", "error": str(exc)})
         await websocket.close(code=1011)
+    finally:
+        if session is not None:
+            await session.close()
+
+
+def _create_stream_session(
+    websocket: WebSocket, payload: Dict[str, Any]
+) -> Union[ASRStreamSession, RealtimeASRSession]:
+    settings = get_settings()
+    engine_id = asr_provider.resolve_engine_id(payload.get("engine", "default"))
+    engine_config = asr_provider.get_engine_config(engine_id)
+    overrides = payload.get("config") if isinstance(payload.get("config"), dict) else {}
+    sample_rate = int(payload.get("sample_rate") or payload.get("sampleRate") or 16000)
+    channels = int(payload.get("channels") or 1)
+    if asr_provider.is_realtime(engine_config):
+        return RealtimeASRSession(
+            engine_config,
+            overrides,
+            send_json=websocket.send_json,
+            sample_rate=sample_rate,
+            channels=channels,
+        )
+
+    window_options = payload.get("window")
+    window = None
+    if window_options:
+        options = window_options if isinstance(window_options, dict) else {}
+        window = SlidingWindow(
+            sample_rate,
+            channels,
+            window_ms=int(options.get("lengthMs") or settings.asr_window_ms),
+            overlap_ms=int(options.get("overlapMs") or settings.asr_window_overlap_ms),
+        )
+
+    vad_options = payload.get("vad", settings.asr_vad_enabled)
+    vad = None
+    if vad_options and window is None:
+        options = vad_options if isinstance(vad_options, dict) else {}
+        vad = EnergyVAD(
+            sample_rate,
+            channels,
+            threshold=float(options.get("threshold") or settings.asr_vad_threshold),
+            silence_ms=int(options.get("silenceMs") or settings.asr_vad_silence_ms),
+            min_speech_ms=int(options.get("minSpeechMs") or settings.asr_vad_min_speech_ms),
+            max_segment_ms=int(options.get("maxSegmentMs") or settings.asr_vad_max_segment_ms),
+        )
+    partial_ms = payload.get("partialIntervalMs", settings.asr_vad_partial_ms)
+
+    return ASRStreamSession(
+        engine_config,
+        overrides,
+        send_json=websocket.send_json,
+        sample_rate=sample_rate,
+        channels=channels,
+        vad=vad,
+        concurrency=settings.asr_stream_concurrency,
+        partial_interval_ms=int(partial_ms or 0),
+        buffer=PCMBuffer(settings.asr_buffer_memory_bytes, settings.asr_buffer_dir),
+        window=window,
+    )
 
 
 def _resolve_engine_id(engine_id: str) -> str:
-    if engine_id == "default":
-        default_spec = registry.get_default("asr")
-        return default_spec.id if default_spec else ""
-    return engine_id
+    return asr_provider.resolve_engine_id(engine_id)
 
 
 def _get_engine_config(engine_id: str):
-    if not engine_id:
-        raise HTTPException(status_code=400, detail="Missing engine id")
-    config = runtime_store.get("asr", engine_id)
-    if not config or not config.base_url:
-        raise HTTPException(status_code=404, detail="ASR engine not configured")
-    engine_type = (config.engine_type or "openai_compat").lower()
-    if engine_type not in {"dify_asr", "coze_asr", "dify", "coze"} and not config.model:
-        raise HTTPException(status_code=400, detail="ASR engine missing model")
-    return config
+    try:
+        return asr_provider.get_engine_config(engine_id)
+    except ASRConfigError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+
+
+async def _transcribe(
+    config,
+    audio_bytes: AudioPayload,
+    overrides: Optional[Dict[str, Any]],
+    filename: str,
+    content_type: str,
+    *,
+    response: Optional[Response] = None,
+    digest: Optional[str] = None,
+) -> dict:
+    async def upload() -> dict:
+        return await asr_provider.transcribe(config, audio_bytes, overrides, filename, content_type)
+
+    try:
+        if digest is None:
+            return await upload()
+        cache = get_asr_cache()
+        result, hit = await cache.transcribe(cache.key_for(config, digest, overrides or {}), upload)
+    except ASRConfigError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+    if response is not None:
+        response.headers["X-ASR-Cache"] = "hit" if hit else "miss"
+    return result
+
+
+async def _transcribe_stream(
+    config,
+    chunks: AsyncIterator[bytes],
+    size: Optional[int],
+    overrides: Dict[str, Any],
+    filename: str,
+    content_type: str,
+    *,
+    response: Response,
+    digest: Optional[str] = None,
+) -> dict:
+    # Streamed bodies belong to this request alone, so they never join a single-flight call. Without a
+    # digest up front the body is hashed on its way upstream and only the result is cached.
+    cache = get_asr_cache()
+    if digest is not None:
+        cached = cache.lookup(cache.key_for(config, digest, overrides))
+        if cached is not None:
+            response.headers["X-ASR-Cache"] = "hit"
+            return cached
+    hashed = None
+    if digest is None and cache.enabled:
+        hashed = StreamDigest()
+        chunks = hashed.wrap(chunks)
+    try:
+        result = await asr_provider.transcribe(
+            config, AudioStream(chunks, size=size), overrides, filename, content_type
+        )
+    except ASRConfigError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+    if hashed is not None and cache.accepts(hashed.size):
+        digest = hashed.hexdigest()
+    if digest is not None:
+        cache.store(cache.key_for(config, digest, overrides), result)
+        response.headers["X-ASR-Cache"] = "miss"
+    return result
+
+
+async def _iter_upload(file: UploadFile, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    await file.seek(0)
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _content_length(request: Request) -> Optional[int]:
+    if "transfer-encoding" in request.headers:
+        return None
+    value = request.headers.get("content-length")
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length") from exc
+
+
+def _parse_config_param(value: Optional[str]) -> Dict[str, Any]:
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Invalid config JSON") from exc
+    if not isinstance(parsed, dict):
+        raise HTTPException(status_code=400, detail="Config must be a JSON object")
+    return parsed
 
 
 def _extract_audio_bytes(data: Any) -> bytes:
@@ -225,122 +355,3 @@ def _resolve_file_meta(overrides: Optional[Dict[str, Any]]) -> tuple[str, str]:
     )
     content_type = overrides.get("content_type") or overrides.get("mime_type") or "application/octet-stream"
     return str(filename), str(content_type)
-
-
-def _encode_wav_pcm16(pcm_bytes: bytes, sample_rate: int, channels: int) -> bytes:
-    with io.BytesIO() as buffer:
-        with wave.open(buffer, "wb") as wav_file:
-            wav_file.setnchannels(max(1, channels))
-            wav_file.setsampwidth(2)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(pcm_bytes)
-        return buffer.getvalue()
-
-
-async def _forward_transcription(
-    config,
-    audio_bytes: bytes,
-    overrides: Optional[Dict[str, Any]],
-    filename: str,
-    content_type: str,
-) -> dict:
-    headers = {}
-    headers.update(config.headers)
-    api_key = resolve_api_key(config.api_key_env)
-    if api_key:
-        headers["Authorization"] = f"Bearer {api_key}"
-
-    data: Dict[str, Any] = {"model": config.model}
-    data.update(config.default_params)
-    if isinstance(overrides, dict):
-        data.update(sanitize_config(overrides, blocked=ASR_BLOCKED_CONFIG_KEYS))
-
-    transcription_path = config.paths.get("transcription") if config.paths else None
-    path = normalize_path(transcription_path or "/audio/transcriptions")
-    url = config.base_url.rstrip("/") + path
-
-    files = {"file": (filename, audio_bytes, content_type)}
-
-    async with httpx.AsyncClient(timeout=config.timeout) as client:
-        response = await client.post(url, headers=headers, data=data, files=files)
-        response.raise_for_status()
-        return response.json()
-
-
-def _merge_params(config, overrides: Dict[str, Any]) -> Dict[str, Any]:
-    merged = dict(config.default_params or {})
-    merged.update(sanitize_config(overrides, blocked=ASR_BLOCKED_CONFIG_KEYS))
-    return merged
-
-
-async def _forward_dify_transcription(
-    config,
-    audio_bytes: bytes,
-    overrides: Dict[str, Any],
-    filename: str,
-    content_type: str,
-) -> dict:
-    params = _merge_params(config, overrides)
-    api_server = params.get("api_server") or config.base_url
-    api_key = params.get("api_key") or resolve_api_key(config.api_key_env)
-    username = params.get("username") or params.get("user")
-
-    if not api_server or not api_key:
-        raise HTTPException(status_code=400, detail="Dify ASR missing API server or key")
-
-    headers = {"Authorization": f"Bearer {api_key}"}
-    headers.update(config.headers)
-    data: Dict[str, Any] = {}
-    if username:
-        data["user"] = username
-
-    transcription_path = config.paths.get("transcription") if config.paths else None
-    path = normalize_path(transcription_path or "/audio-to-text")
-    url = api_server.rstrip("/") + path
-
-    files = {"file": (filename, audio_bytes, content_type)}
-    async with httpx.AsyncClient(timeout=config.timeout) as client:
-        response = await client.post(url, headers=headers, data=data, files=files)
-        response.raise_for_status()
-        payload = response.json()
-    text = _extract_text(payload)
-    return {"text": text} if text else payload
-
-
-async def _forward_coze_transcription(
-    config,
-    audio_bytes: bytes,
-    overrides: Dict[str, Any],
-    filename: str,
-    content_type: str,
-) -> dict:
-    params = _merge_params(config, overrides)
-    api_base = params.get("api_base") or config.base_url
-    token = params.get("token") or resolve_api_key(config.api_key_env)
-
-    if not api_base or not token:
-        raise HTTPException(status_code=400, detail="Coze ASR missing API base or token")
-
-    headers = {"Authorization": f"Bearer {token}"}
-    headers.update(config.headers)
-
-    transcription_path = config.paths.get("transcription") if config.paths else None
-    path = normalize_path(transcription_path or "/v1/audio/transcriptions")
-    url = api_base.rstrip("/") + path
-
-    files = {"file": (filename, audio_bytes, content_type)}
-    async with httpx.AsyncClient(timeout=config.timeout) as client:
-        response = await client.post(url, headers=headers, files=files)
-        response.raise_for_status()
-        payload = response.json()
-    text = _extract_text(payload)
-    return {"text": text} if text else payload
-
-
-def _extract_text(payload: Dict[str, Any]) -> str:
-    if isinstance(payload.get("text"), str):
-        return payload["text"]
-    data = payload.get("data")
-    if isinstance(data, dict) and isinstance(data.get("text"), str):
-        return data["text"]
-    return ""
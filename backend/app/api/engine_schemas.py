@@ -81,6 +81,12 @@ class EngineRunRequest(BaseModel):
     config: Dict[str, Any] = Field(default_factory=dict)
 
 
+class TTSCacheWarmRequest(BaseModel):
+    engine: str = "default"
+    phrases: List[str] = Field(default_factory=list)
+    config: Dict[str, Any] = Field(default_factory=dict)
+
+
 class ConversationRequest(BaseModel):
     data: Optional[Dict[str, Any]] = None
 
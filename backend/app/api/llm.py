@@ -16,6 +16,7 @@ from app.api.engine_schemas import (
 )
 from app.services.engines import registry, runtime_store
 from app.services.engines.health import check_engine_health
+from app.core.http_clients import get_http_client
 from app.core.http_utils import resolve_api_key, sanitize_config
 
 router = APIRouter(prefix="/llm", tags=["llm"])
@@ -136,14 +137,14 @@ async def _stream_openai_compat(
         path = f"/{path}"
     url = base_url.rstrip("/") + path
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            async with client.stream("POST", url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line == "":
-                        yield "\n"
-                    else:
-                        yield f"{line}\n"
+        client = get_http_client(url)
+        async with client.stream("POST", url, headers=headers, json=payload, timeout=timeout) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line == "":
+                    yield "\n"
+                else:
+                    yield f"{line}\n"
     except httpx.HTTPError as exc:
         message = str(exc)
         for chunk in _sse_error(message):
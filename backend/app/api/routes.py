@@ -1,4 +1,8 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect
+
+from app.core.settings import get_settings
 
 from app.services.event_dispatcher import EventDispatcher
 from app.services.ws_hub import WebSocketHub
@@ -15,10 +19,21 @@ async def ws_endpoint(ws: WebSocket) -> None:
     try:
         while True:
             message = await ws.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
             if message.get("text") is not None:
                 await hub.handle_text(peer, message["text"])
             elif message.get("bytes") is not None:
                 await hub.handle_bytes(peer, message["bytes"])
     except WebSocketDisconnect:
+        pass
+    finally:
         await hub.disconnect(peer)
-        return
+
+
+@router.get("/ws/stats")
+async def ws_stats(authorization: Optional[str] = Header(default=None)) -> dict:
+    token = get_settings().ws_auth_token
+    if token and authorization != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="invalid token")
+    return hub.stats()
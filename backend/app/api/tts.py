@@ -1,7 +1,7 @@
-from typing import Any, AsyncIterator, Dict, Optional
+import json
+from typing import Any, Dict, Optional
 
-import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import Response, StreamingResponse
 
 from app.api.engine_schemas import (
@@ -12,12 +12,17 @@ from app.api.engine_schemas import (
     EngineParamsResponse,
     EngineRunRequest,
     HealthResponse,
+    TTSCacheWarmRequest,
     VoiceDesc,
     VoiceListResponse,
 )
+from app.core.settings import get_settings
 from app.services.engines import registry, runtime_store
 from app.services.engines.health import check_engine_health
-from app.core.http_utils import normalize_path, resolve_api_key, sanitize_config
+from app.services.providers import tts as tts_provider
+from app.services.providers.tts import TTSConfigError
+from app.services.tts_cache import CachedAudio, get_tts_cache
+from app.services.tts_stream import TTSStreamSession
 
 router = APIRouter(prefix="/tts", tags=["tts"])
 
@@ -59,65 +64,154 @@ async def get_tts_engine_health(engine: str) -> HealthResponse:
     return HealthResponse(**await check_engine_health(config))
 
 
+@router.get("/cache/stats")
+async def get_tts_cache_stats() -> dict:
+    return get_tts_cache().stats()
+
+
+@router.post("/cache/warm")
+async def warm_tts_cache(request: TTSCacheWarmRequest) -> dict:
+    cache = get_tts_cache()
+    if not cache.enabled:
+        raise HTTPException(status_code=400, detail="TTS cache disabled")
+    engine_id = _resolve_engine_id(request.engine)
+    config = _get_engine_config(engine_id)
+    phrases = [phrase for phrase in request.phrases if isinstance(phrase, str) and phrase.strip()]
+    if not phrases:
+        raise HTTPException(status_code=400, detail="Missing phrases")
+    return await cache.warm(engine_id, config, phrases, request.config or {})
+
+
 @router.post("/engines")
-async def run_tts_engine(request: EngineRunRequest) -> StreamingResponse:
+async def run_tts_engine(request: EngineRunRequest) -> Response:
     engine_id = _resolve_engine_id(request.engine)
     config = _get_engine_config(engine_id)
     text = _coerce_text(request.data)
     if not text:
         raise HTTPException(status_code=400, detail="Missing text input")
 
-    engine_type = (config.engine_type or "openai_compat").lower()
     overrides = request.config if isinstance(request.config, dict) else {}
 
-    if engine_type in {"dify_tts", "dify"}:
-        stream = await _stream_dify_tts(config, text, overrides)
-        return StreamingResponse(stream, media_type="audio/mpeg")
-
-    if engine_type in {"coze_tts", "coze"}:
-        stream = await _stream_coze_tts(config, text, overrides)
-        return StreamingResponse(stream, media_type="audio/mpeg")
+    cache = get_tts_cache()
+    cache_key = cache.key_for(engine_id, config, text, overrides)
+    if cache_key:
+        entry = cache.get(cache_key)
+        clip = await cache.read(entry) if entry is not None else None
+        if clip is not None:
+            return StreamingResponse(clip, media_type=entry.media_type, headers=_clip_headers(entry, "hit"))
+        try:
+            if cache.filling(cache_key):
+                entry = await cache.fetch(cache_key, config, text, overrides)
+                clip = await cache.read(entry)
+                if clip is not None:
+                    return StreamingResponse(clip, media_type=entry.media_type, headers=_clip_headers(entry, "miss"))
+            stream, media_type = await cache.stream(cache_key, config, text, overrides)
+        except TTSConfigError as exc:
+            raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+        return StreamingResponse(stream, media_type=media_type, headers={"X-TTS-Cache": "miss"})
+
+    settings = get_settings()
+    try:
+        stream, media_type = await tts_provider.synthesize_chunked(
+            config,
+            text,
+            overrides,
+            max_chars=config.max_text_chars or settings.tts_chunk_max_chars,
+            parallelism=config.parallelism or settings.tts_chunk_parallelism,
+        )
+    except TTSConfigError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+    return StreamingResponse(stream, media_type=media_type)
 
-    base_url_override, api_key_override = _resolve_connection_overrides(overrides)
-    payload: Dict[str, Any] = {"model": config.model, "input": text}
-    payload.update(config.default_params)
-    payload.update(sanitize_config(overrides))
 
-    if "voice" not in payload:
-        raise HTTPException(status_code=400, detail="Missing voice for TTS")
+@router.websocket("/engines/stream")
+async def run_tts_engine_stream(websocket: WebSocket) -> None:
+    await websocket.accept()
 
-    speech_path = config.paths.get("speech") if config.paths else None
-    path = normalize_path(speech_path or "/audio/speech")
-    url = (base_url_override or config.base_url).rstrip("/") + path
+    session: Optional[TTSStreamSession] = None
 
-    headers = {"Content-Type": "application/json"}
-    headers.update(config.headers)
-    api_key = api_key_override or resolve_api_key(config.api_key_env)
-    if api_key:
-        headers["Authorization"] = f"Bearer {api_key}"
+    async def send_error(error: str) -> None:
+        # Once a session exists its writer task owns the socket, so errors queue behind its frames.
+        if session is not None:
+            session.send_json({"type": "error", "error": error})
+        else:
+            await websocket.send_json({"type": "error", "error": error})
 
-    media_type = _audio_media_type(payload.get("response_format") or payload.get("format"))
-    content = await _request_tts_bytes(url, headers, payload, timeout=config.timeout)
-    return Response(content=content, media_type=media_type)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
+            if message.get("text") is None:
+                await send_error("Binary frames are not supported.")
+                continue
+
+            try:
+                payload = json.loads(message["text"])
+            except json.JSONDecodeError:
+                await send_error("Invalid JSON payload.")
+                continue
+            if not isinstance(payload, dict):
+                await send_error("Invalid JSON payload.")
+                continue
+
+            message_type = payload.get("type")
+            if message_type == "start":
+                if session is not None:
+                    await session.close()
+                    session = None
+                try:
+                    engine_id = tts_provider.resolve_engine_id(str(payload.get("engine") or "default"))
+                    config = tts_provider.get_engine_config(engine_id)
+                except TTSConfigError as exc:
+                    await send_error(str(exc))
+                    continue
+                overrides: Dict[str, Any] = payload.get("config") if isinstance(payload.get("config"), dict) else {}
+                session = TTSStreamSession(
+                    config,
+                    overrides,
+                    send_json=websocket.send_json,
+                    send_bytes=websocket.send_bytes,
+                    concurrency=config.parallelism or get_settings().voice_tts_concurrency,
+                    max_queue=get_settings().ws_send_queue_size,
+                    on_overflow=lambda: websocket.close(code=1013),
+                )
+                session.send_json({"type": "ready", "mediaType": tts_provider.resolve_media_type(config, overrides)})
+            elif session is None:
+                await send_error("Engine not initialized.")
+            elif message_type == "text":
+                text = payload.get("text")
+                if isinstance(text, str):
+                    session.feed(text)
+                if payload.get("flush"):
+                    session.flush()
+            elif message_type == "flush":
+                session.flush()
+            elif message_type == "cancel":
+                await session.cancel()
+            else:
+                await send_error("Unknown message type.")
+
+    except WebSocketDisconnect:
+        return
+    finally:
+        if session is not None:
+            await session.close()
 
 
 def _resolve_engine_id(engine_id: str) -> str:
-    if engine_id == "default":
-        default_spec = registry.get_default("tts")
-        return default_spec.id if default_spec else ""
-    return engine_id
+    return tts_provider.resolve_engine_id(engine_id)
 
 
 def _get_engine_config(engine_id: str):
-    if not engine_id:
-        raise HTTPException(status_code=400, detail="Missing engine id")
-    config = runtime_store.get("tts", engine_id)
-    if not config or not config.base_url:
-        raise HTTPException(status_code=404, detail="TTS engine not configured")
-    engine_type = (config.engine_type or "openai_compat").lower()
-    if engine_type not in {"dify_tts", "coze_tts", "dify", "coze"} and not config.model:
-        raise HTTPException(status_code=400, detail="TTS engine missing model")
-    return config
+    try:
+        return tts_provider.get_engine_config(engine_id)
+    except TTSConfigError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc)) from exc
+
+
+def _clip_headers(entry: CachedAudio, status: str) -> Dict[str, str]:
+    return {"Content-Length": str(entry.size), "X-TTS-Cache": status}
 
 
 def _coerce_text(data: Any) -> str:
@@ -130,186 +224,3 @@ def _coerce_text(data: Any) -> str:
         if isinstance(text, str):
             return text
     return ""
-
-
-def _resolve_connection_overrides(config: Dict[str, Any]) -> tuple[Optional[str], Optional[str]]:
-    base_url = config.get("base_url") or config.get("baseUrl")
-    api_key = config.get("api_key") or config.get("apiKey")
-    return (
-        str(base_url).strip() if isinstance(base_url, str) and base_url.strip() else None,
-        str(api_key).strip() if isinstance(api_key, str) and api_key.strip() else None,
-    )
-
-
-def _audio_media_type(format_name: Optional[str]) -> str:
-    if not format_name:
-        return "audio/mpeg"
-    value = str(format_name).lower()
-    if value == "wav":
-        return "audio/wav"
-    if value == "opus":
-        return "audio/opus"
-    if value == "aac":
-        return "audio/aac"
-    if value == "flac":
-        return "audio/flac"
-    return "audio/mpeg"
-
-
-async def _create_tts_stream(
-    url: str,
-    headers: Dict[str, str],
-    payload: Dict[str, Any],
-    *,
-    timeout: float,
-) -> AsyncIterator[bytes]:
-    client = httpx.AsyncClient(timeout=timeout)
-    try:
-        response = await client.stream("POST", url, headers=headers, json=payload).__aenter__()
-    except httpx.HTTPError as exc:
-        await client.aclose()
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
-
-    if response.status_code >= 400:
-        detail = await response.aread()
-        await response.aclose()
-        await client.aclose()
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=detail.decode("utf-8", errors="ignore") or response.reason_phrase,
-        )
-
-    async def iterator() -> AsyncIterator[bytes]:
-        try:
-            async for chunk in response.aiter_bytes():
-                yield chunk
-        finally:
-            await response.aclose()
-            await client.aclose()
-
-    return iterator()
-
-
-async def _request_tts_bytes(
-    url: str,
-    headers: Dict[str, str],
-    payload: Dict[str, Any],
-    *,
-    timeout: float,
-) -> bytes:
-    try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(url, headers=headers, json=payload)
-    except httpx.HTTPError as exc:
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
-
-    if response.status_code >= 400:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=response.text or response.reason_phrase,
-        )
-
-    return response.content
-
-
-def _merge_params(config, overrides: Dict[str, Any]) -> Dict[str, Any]:
-    merged = dict(config.default_params or {})
-    merged.update(sanitize_config(overrides))
-    return merged
-
-
-async def _stream_dify_tts(
-    config,
-    text: str,
-    overrides: Dict[str, Any],
-) -> AsyncIterator[bytes]:
-    params = _merge_params(config, overrides)
-    api_server = params.get("api_server") or config.base_url
-    api_key = params.get("api_key") or resolve_api_key(config.api_key_env)
-    username = params.get("username") or params.get("user")
-
-    if not api_server:
-        return
-    if not api_key:
-        return
-    if not username:
-        return
-
-    payload = {"text": text, "user": username}
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    headers.update(config.headers)
-
-    speech_path = config.paths.get("speech") if config.paths else None
-    path = normalize_path(speech_path or "/text-to-audio")
-    url = api_server.rstrip("/") + path
-
-    return await _create_tts_stream(url, headers, payload, timeout=config.timeout)
-
-
-async def _stream_coze_tts(
-    config,
-    text: str,
-    overrides: Dict[str, Any],
-) -> AsyncIterator[bytes]:
-    params = _merge_params(config, overrides)
-    api_base = params.get("api_base") or config.base_url
-    token = params.get("token") or resolve_api_key(config.api_key_env)
-    bot_id = params.get("bot_id")
-    response_format = params.get("response_format") or "mp3"
-    sample_rate = params.get("sample_rate") or 16000
-
-    if not api_base or not token or not bot_id:
-        return
-
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    headers.update(config.headers)
-
-    voice_id = await _fetch_coze_voice_id(
-        api_base,
-        headers,
-        bot_id,
-        config.paths.get("bot") if config.paths else None,
-        timeout=config.timeout,
-    )
-    if not voice_id:
-        return
-
-    payload = {
-        "input": text,
-        "voice_id": voice_id,
-        "speed": params.get("speed") or 1.0,
-        "response_format": response_format,
-        "sample_rate": sample_rate,
-    }
-
-    speech_path = config.paths.get("speech") if config.paths else None
-    path = normalize_path(speech_path or "/v1/audio/speech")
-    url = api_base.rstrip("/") + path
-
-    return await _create_tts_stream(url, headers, payload, timeout=config.timeout)
-
-
-async def _fetch_coze_voice_id(
-    api_base: str,
-    headers: Dict[str, str],
-    bot_id: str,
-    path_template: Optional[str],
-    *,
-    timeout: float,
-) -> Optional[str]:
-    path = path_template or "/v1/bots/{bot_id}"
-    if "{bot_id}" in path:
-        path = path.replace("{bot_id}", bot_id)
-    path = normalize_path(path)
-    url = api_base.rstrip("/") + path
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-    voice_info = (data.get("data") or {}).get("voice_info_list") or []
-    if not voice_info:
-        return None
-    voice_id = voice_info[0].get("voice_id")
-    if isinstance(voice_id, str) and voice_id:
-        return voice_id
-    return None
@@ -1,18 +1,28 @@
 import logging
 import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from fastapi import FastAPI
 
 from app.core.settings import get_settings
-from app.extensions import ext_catalogs, ext_cors, ext_engines, ext_logging
+from app.extensions import ext_catalogs, ext_cors, ext_engines, ext_http, ext_logging
 
 logger = logging.getLogger(__name__)
 
+EXTENSIONS = [
+    ext_logging,
+    ext_cors,
+    ext_http,
+    ext_engines,
+    ext_catalogs,
+]
+
 
 def create_app() -> FastAPI:
     settings = get_settings()
     start_time = time.perf_counter()
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
     initialize_extensions(app)
     end_time = time.perf_counter()
     if settings.debug:
@@ -21,11 +31,22 @@ def create_app() -> FastAPI:
 
 
 def initialize_extensions(app: FastAPI) -> None:
-    extensions = [
-        ext_logging,
-        ext_cors,
-        ext_engines,
-        ext_catalogs,
-    ]
-    for ext in extensions:
+    for ext in EXTENSIONS:
         ext.init_app(app)
+
+
+async def shutdown_extensions(app: FastAPI) -> None:
+    for ext in reversed(EXTENSIONS):
+        shutdown = getattr(ext, "shutdown", None)
+        if shutdown is None:
+            continue
+        try:
+            await shutdown(app)
+        except Exception:
+            logger.exception("Extension shutdown failed: %s", ext.__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    await shutdown_extensions(app)
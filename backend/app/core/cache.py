@@ -0,0 +1,81 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self._items: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._items.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if self.ttl > 0 and expires_at <= time.monotonic():
+            self._items.pop(key, None)
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.max_size <= 0:
+            return
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def pop(self, key: K) -> Optional[V]:
+        entry = self._items.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+class SingleFlight(Generic[K, V]):
+    def __init__(self) -> None:
+        self._calls: Dict[K, "asyncio.Task[V]"] = {}
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        # Shielded so one caller going away does not cancel the call for the others.
+        return await asyncio.shield(self.start(key, fn))
+
+    def start(self, key: K, fn: Callable[[], Awaitable[V]]) -> "asyncio.Task[V]":
+        task = self._calls.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def _forget(self, key: K, task: "asyncio.Task[V]") -> None:
+        if self._calls.get(key) is task:
+            self._calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    def __contains__(self, key: object) -> bool:
+        task = self._calls.get(key)
+        return task is not None and not task.done()
+
+    def __len__(self) -> int:
+        return len(self._calls)
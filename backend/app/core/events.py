@@ -2,7 +2,31 @@ import json
 import time
 import uuid
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary encoding
+    msgpack = None
+
+MSGPACK_AVAILABLE = msgpack is not None
+PROTOCOL_LEGACY = 1
+PROTOCOL_COMPACT = 2
+WIRE_FORMATS = ("json", "compact", "msgpack")
+LEGACY_EVENT_TYPES = frozenset({"llm.delta", "llm.final", "tts.end"})
+COMPACT_FIELDS = {
+    "type": "t",
+    "id": "i",
+    "data": "d",
+    "ts": "ts",
+    "sessionId": "s",
+    "source": "src",
+}
 
 
 @dataclass
@@ -31,6 +55,8 @@ def parse_event(raw: str) -> EventEnvelope:
 
     if not isinstance(data, dict):
         raise EventParseError("Event must be a JSON object")
+    if "t" in data and "type" not in data:
+        data = expand_event(data)
 
     event_type = data.get("type")
     if not isinstance(event_type, str) or not event_type:
@@ -94,3 +120,39 @@ def make_event(
     if include_legacy_payload:
         payload["payload"] = data
     return payload
+
+
+def compact_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {COMPACT_FIELDS[key]: value for key, value in event.items() if key in COMPACT_FIELDS}
+
+
+def expand_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    fields = {short: key for key, short in COMPACT_FIELDS.items()}
+    return {fields.get(key, key): value for key, value in event.items()}
+
+
+def encode_event(event: Dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(event).decode("utf-8")
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+def event_audio(event: Dict[str, Any]) -> Optional[bytes]:
+    data = event.get("data")
+    if not isinstance(data, dict):
+        return None
+    audio = data.get("audio")
+    return bytes(audio) if isinstance(audio, (bytes, bytearray)) else None
+
+
+def encode_event_as(event: Dict[str, Any], wire_format: str) -> Union[str, bytes]:
+    if wire_format != "msgpack" or msgpack is None:
+        audio = event_audio(event)
+        if audio is not None:
+            return audio
+    if wire_format == "json":
+        return encode_event(event)
+    compact = compact_event(event)
+    if wire_format == "msgpack" and msgpack is not None:
+        return msgpack.packb(compact, use_bin_type=True)
+    return encode_event(compact)
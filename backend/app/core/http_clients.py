@@ -0,0 +1,139 @@
+import asyncio
+import importlib.util
+import logging
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HttpPoolConfig:
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    def merge(self, other: "HttpPoolConfig") -> "HttpPoolConfig":
+        return HttpPoolConfig(
+            max_connections=max(self.max_connections, other.max_connections),
+            max_keepalive_connections=max(
+                self.max_keepalive_connections, other.max_keepalive_connections
+            ),
+            keepalive_expiry=max(self.keepalive_expiry, other.keepalive_expiry),
+            http2=self.http2 or other.http2,
+        )
+
+
+class HttpClientManager:
+    def __init__(self, default_pool: Optional[HttpPoolConfig] = None) -> None:
+        self.default_pool = default_pool or HttpPoolConfig()
+        self._pools: Dict[str, HttpPoolConfig] = {}
+        self._clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+    def configure(self, base_url: str, pool: HttpPoolConfig) -> None:
+        key = _origin(base_url)
+        if not key:
+            return
+        current = self._pools.get(key)
+        self._pools[key] = current.merge(pool) if current else pool
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        key = _origin(url)
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(key)
+        if entry and entry[0] is loop and not entry[1].is_closed:
+            return entry[1]
+        client = self._create_client(self._pools.get(key) or self.default_pool)
+        self._clients[key] = (loop, client)
+        return client
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        loop = asyncio.get_running_loop()
+        for owner, client in clients:
+            if owner is not loop or client.is_closed:
+                continue
+            try:
+                await client.aclose()
+            except Exception:
+                logger.debug("Failed to close HTTP client", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": sorted(self._clients.keys()),
+            "pools": {
+                key: {
+                    "max_connections": pool.max_connections,
+                    "max_keepalive_connections": pool.max_keepalive_connections,
+                    "keepalive_expiry": pool.keepalive_expiry,
+                    "http2": pool.http2,
+                }
+                for key, pool in self._pools.items()
+            },
+        }
+
+    @staticmethod
+    def _create_client(pool: HttpPoolConfig) -> httpx.AsyncClient:
+        http2 = pool.http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+        # Clients are shared by every caller of an origin, so upstream Set-Cookie headers must not stick.
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=60.0,
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            limits=httpx.Limits(
+                max_connections=pool.max_connections,
+                max_keepalive_connections=pool.max_keepalive_connections,
+                keepalive_expiry=pool.keepalive_expiry,
+            ),
+        )
+
+
+def parse_pool_config(value: Any) -> Optional[HttpPoolConfig]:
+    if not isinstance(value, dict):
+        return None
+    defaults = HttpPoolConfig()
+    return HttpPoolConfig(
+        max_connections=_as_int(value.get("max_connections"), defaults.max_connections),
+        max_keepalive_connections=_as_int(
+            value.get("max_keepalive_connections"), defaults.max_keepalive_connections
+        ),
+        keepalive_expiry=_as_float(value.get("keepalive_expiry"), defaults.keepalive_expiry),
+        http2=bool(value.get("http2", defaults.http2)),
+    )
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url or "")
+    if not parts.scheme or not parts.netloc:
+        return url or ""
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def _as_int(value: Any, fallback: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return fallback
+
+
+def _as_float(value: Any, fallback: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return fallback
+
+
+http_clients = HttpClientManager()
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    return http_clients.get(url)
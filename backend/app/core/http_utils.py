@@ -30,3 +30,10 @@ def normalize_path(path: str) -> str:
         return f"/{path}"
     return path
 
+
+def websocket_url(url: str) -> str:
+    if url.startswith("https://"):
+        return "wss://" + url[len("https://") :]
+    if url.startswith("http://"):
+        return "ws://" + url[len("http://") :]
+    return url
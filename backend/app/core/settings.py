@@ -38,13 +38,55 @@ class AppSettings(BaseSettings):
         validation_alias="PLUGIN_CATALOG_PATH",
     )
     ws_auth_token: str | None = Field(default=None, validation_alias="WS_AUTH_TOKEN")
+    ws_send_queue_size: int = Field(default=256, validation_alias="WS_SEND_QUEUE_SIZE")
+    ws_send_overflow: str = Field(default="drop_oldest", validation_alias="WS_SEND_OVERFLOW")
+    ws_delta_coalesce_ms: int = Field(default=0, validation_alias="WS_DELTA_COALESCE_MS")
+    ws_delta_coalesce_chars: int = Field(default=0, validation_alias="WS_DELTA_COALESCE_CHARS")
+    ws_session_queue_size: int = Field(default=32, validation_alias="WS_SESSION_QUEUE_SIZE")
+    voice_max_seconds: int = Field(default=60, validation_alias="VOICE_MAX_SECONDS")
+    voice_asr_engine: str = Field(default="default", validation_alias="VOICE_ASR_ENGINE")
+    voice_tts_engine: str = Field(default="default", validation_alias="VOICE_TTS_ENGINE")
+    voice_tts_concurrency: int = Field(default=2, validation_alias="VOICE_TTS_CONCURRENCY")
+    asr_vad_enabled: bool = Field(default=False, validation_alias="ASR_VAD_ENABLED")
+    asr_vad_threshold: float = Field(default=500.0, validation_alias="ASR_VAD_THRESHOLD")
+    asr_vad_silence_ms: int = Field(default=600, validation_alias="ASR_VAD_SILENCE_MS")
+    asr_vad_min_speech_ms: int = Field(default=200, validation_alias="ASR_VAD_MIN_SPEECH_MS")
+    asr_vad_max_segment_ms: int = Field(default=15000, validation_alias="ASR_VAD_MAX_SEGMENT_MS")
+    asr_vad_partial_ms: int = Field(default=0, validation_alias="ASR_VAD_PARTIAL_MS")
+    asr_buffer_memory_bytes: int = Field(
+        default=4 * 1024 * 1024, validation_alias="ASR_BUFFER_MEMORY_BYTES"
+    )
+    asr_buffer_dir: str | None = Field(default=None, validation_alias="ASR_BUFFER_DIR")
+    asr_stream_concurrency: int = Field(default=2, validation_alias="ASR_STREAM_CONCURRENCY")
+    asr_window_ms: int = Field(default=8000, validation_alias="ASR_WINDOW_MS")
+    asr_window_overlap_ms: int = Field(default=2000, validation_alias="ASR_WINDOW_OVERLAP_MS")
+    asr_preprocess_enabled: bool = Field(default=True, validation_alias="ASR_PREPROCESS_ENABLED")
+    asr_trim_threshold: float = Field(default=300.0, validation_alias="ASR_TRIM_THRESHOLD")
+    asr_cache_max_entries: int = Field(default=256, validation_alias="ASR_CACHE_MAX_ENTRIES")
+    asr_cache_ttl: float = Field(default=600.0, validation_alias="ASR_CACHE_TTL")
+    asr_cache_max_audio_bytes: int = Field(
+        default=10 * 1024 * 1024, validation_alias="ASR_CACHE_MAX_AUDIO_BYTES"
+    )
+    tts_cache_dir: str = Field(default="data/tts_cache", validation_alias="TTS_CACHE_DIR")
+    tts_cache_max_bytes: int = Field(default=256 * 1024 * 1024, validation_alias="TTS_CACHE_MAX_BYTES")
+    tts_cache_max_text_chars: int = Field(default=200, validation_alias="TTS_CACHE_MAX_TEXT_CHARS")
+    tts_chunk_max_chars: int = Field(default=0, validation_alias="TTS_CHUNK_MAX_CHARS")
+    tts_chunk_parallelism: int = Field(default=3, validation_alias="TTS_CHUNK_PARALLELISM")
     ssrf_proxy_url: str | None = Field(default=None, validation_alias="SSRF_PROXY_URL")
     ssrf_block_private: bool = Field(default=True, validation_alias="SSRF_BLOCK_PRIVATE")
     log_level: str = Field(default="INFO", validation_alias="LOG_LEVEL")
+    http_pool_max_connections: int = Field(default=100, validation_alias="HTTP_POOL_MAX_CONNECTIONS")
+    http_pool_max_keepalive: int = Field(default=20, validation_alias="HTTP_POOL_MAX_KEEPALIVE")
+    http_pool_keepalive_expiry: float = Field(
+        default=30.0, validation_alias="HTTP_POOL_KEEPALIVE_EXPIRY"
+    )
+    http2_enabled: bool = Field(default=False, validation_alias="HTTP2_ENABLED")
     llm_provider: str = Field(default="openai", validation_alias="LLM_PROVIDER")
     llm_timeout: float = Field(default=30.0, validation_alias="LLM_TIMEOUT")
     llm_temperature: float = Field(default=0.7, validation_alias="LLM_TEMPERATURE")
     llm_system_prompt: str | None = Field(default=None, validation_alias="LLM_SYSTEM_PROMPT")
+    llm_provider_cache_size: int = Field(default=64, validation_alias="LLM_PROVIDER_CACHE_SIZE")
+    llm_provider_cache_ttl: float = Field(default=600.0, validation_alias="LLM_PROVIDER_CACHE_TTL")
     openai_api_key: str = Field(default="", validation_alias="OPENAI_API_KEY")
     openai_base_url: str = Field(
         default="https://api.openai.com/v1",
@@ -70,6 +112,10 @@ class AppSettings(BaseSettings):
     coze_token: str = Field(default="", validation_alias="COZE_TOKEN")
     coze_bot_id: str = Field(default="", validation_alias="COZE_BOT_ID")
     coze_user: str = Field(default="whale", validation_alias="COZE_USER")
+    coze_voice_cache_ttl: float = Field(default=300.0, validation_alias="COZE_VOICE_CACHE_TTL")
+    coze_voice_cache_max_stale: float = Field(
+        default=3600.0, validation_alias="COZE_VOICE_CACHE_MAX_STALE"
+    )
     memory_enabled: bool = Field(default=True, validation_alias="MEMORY_ENABLED")
     memory_db_path: str = Field(default="data/memory.db", validation_alias="MEMORY_DB_PATH")
     memory_session_window: int = Field(default=12, validation_alias="MEMORY_SESSION_WINDOW")
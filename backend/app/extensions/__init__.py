@@ -1,8 +1,9 @@
-from . import ext_catalogs, ext_cors, ext_engines, ext_logging
+from . import ext_catalogs, ext_cors, ext_engines, ext_http, ext_logging
 
 __all__ = [
     "ext_catalogs",
     "ext_cors",
     "ext_engines",
+    "ext_http",
     "ext_logging",
 ]
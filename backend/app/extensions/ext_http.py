@@ -0,0 +1,18 @@
+from fastapi import FastAPI
+
+from app.core.http_clients import HttpPoolConfig, http_clients
+from app.core.settings import get_settings
+
+
+def init_app(app: FastAPI) -> None:
+    settings = get_settings()
+    http_clients.default_pool = HttpPoolConfig(
+        max_connections=settings.http_pool_max_connections,
+        max_keepalive_connections=settings.http_pool_max_keepalive,
+        keepalive_expiry=settings.http_pool_keepalive_expiry,
+        http2=settings.http2_enabled,
+    )
+
+
+async def shutdown(app: FastAPI) -> None:
+    await http_clients.aclose()
@@ -6,6 +6,7 @@ from typing import Any, AsyncIterator, Dict, Iterable, Optional, Type
 
 import httpx
 
+from app.core.http_clients import get_http_client
 from app.core.http_utils import normalize_path
 from app.services.engines.runtime_store import EngineRuntimeConfig
 from .types import AgentEvent
@@ -58,15 +59,16 @@ class DifyAgentHandler(AgentHandler):
             "conversation",
             _resolve_path(context.runtime, "chat", "/chat-messages"),
         )
-        async with httpx.AsyncClient(timeout=context.runtime.timeout) as client:
-            response = await client.post(
-                _build_dify_url(api_server, chat_path),
-                headers=headers,
-                json=payload,
-            )
-            if response.status_code >= 400:
-                return ""
-            data = response.json()
+        client = get_http_client(api_server)
+        response = await client.post(
+            _build_dify_url(api_server, chat_path),
+            headers=headers,
+            json=payload,
+            timeout=context.runtime.timeout,
+        )
+        if response.status_code >= 400:
+            return ""
+        data = response.json()
         return str(data.get("conversation_id") or "")
 
     async def stream(self, context: AgentContext, text: str) -> AsyncIterator[AgentEvent]:
@@ -102,39 +104,40 @@ class DifyAgentHandler(AgentHandler):
         }
 
         chat_path = _resolve_path(context.runtime, "chat", "/chat-messages")
-        async with httpx.AsyncClient(timeout=context.runtime.timeout) as client:
-            async with client.stream(
-                "POST",
-                _build_dify_url(api_server, chat_path),
-                headers=headers,
-                json=payload,
-            ) as response:
-                if response.status_code >= 400:
-                    detail = await _read_error_detail(response)
-                    yield AgentEvent(event="error", data={"message": detail})
-                    return
-                current_conversation_id = conversation_id
-                async for line in response.aiter_lines():
-                    chunk = line.strip()
-                    if not chunk or not chunk.startswith("data:"):
-                        continue
-                    data_payload = chunk.split("data:", 1)[1].strip()
-                    if not data_payload:
-                        continue
-                    try:
-                        data = json.loads(data_payload)
-                    except json.JSONDecodeError:
-                        continue
-                    if not current_conversation_id and data.get("conversation_id"):
-                        current_conversation_id = str(data["conversation_id"])
-                        yield AgentEvent(
-                            event="conversation.id",
-                            data={"conversation_id": current_conversation_id},
-                        )
-                    answer = data.get("answer")
-                    event_name = data.get("event", "")
-                    if answer and "message" in str(event_name):
-                        yield AgentEvent(event="message.delta", data={"text": str(answer)})
+        client = get_http_client(api_server)
+        async with client.stream(
+            "POST",
+            _build_dify_url(api_server, chat_path),
+            headers=headers,
+            json=payload,
+            timeout=context.runtime.timeout,
+        ) as response:
+            if response.status_code >= 400:
+                detail = await _read_error_detail(response)
+                yield AgentEvent(event="error", data={"message": detail})
+                return
+            current_conversation_id = conversation_id
+            async for line in response.aiter_lines():
+                chunk = line.strip()
+                if not chunk or not chunk.startswith("data:"):
+                    continue
+                data_payload = chunk.split("data:", 1)[1].strip()
+                if not data_payload:
+                    continue
+                try:
+                    data = json.loads(data_payload)
+                except json.JSONDecodeError:
+                    continue
+                if not current_conversation_id and data.get("conversation_id"):
+                    current_conversation_id = str(data["conversation_id"])
+                    yield AgentEvent(
+                        event="conversation.id",
+                        data={"conversation_id": current_conversation_id},
+                    )
+                answer = data.get("answer")
+                event_name = data.get("event", "")
+                if answer and "message" in str(event_name):
+                    yield AgentEvent(event="message.delta", data={"text": str(answer)})
 
         yield AgentEvent(event="message.done", data={})
 
@@ -153,13 +156,14 @@ class CozeAgentHandler(AgentHandler):
         }
         headers.update(context.runtime.headers)
         conversation_path = _resolve_path(context.runtime, "conversation", "/v1/conversation/create")
-        async with httpx.AsyncClient(timeout=context.runtime.timeout) as client:
-            response = await client.post(
-                _build_url(api_base, conversation_path),
-                headers=headers,
-            )
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client(api_base)
+        response = await client.post(
+            _build_url(api_base, conversation_path),
+            headers=headers,
+            timeout=context.runtime.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
         return str(data.get("data", {}).get("id") or "")
 
     async def stream(self, context: AgentContext, text: str) -> AsyncIterator[AgentEvent]:
@@ -209,34 +213,34 @@ class CozeAgentHandler(AgentHandler):
             separator = "&" if "?" in api_url else "?"
             api_url = f"{api_url}{separator}conversation_id={conversation_id}"
 
-        async with httpx.AsyncClient(timeout=context.runtime.timeout) as client:
-            async with client.stream("POST", api_url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                event_name: Optional[str] = None
-                async for line in response.aiter_lines():
-                    chunk = line.strip()
-                    if not chunk:
-                        continue
-                    if chunk.startswith("event:"):
-                        event_name = chunk.split(":", 1)[1].strip()
-                        continue
-                    if event_name != "conversation.message.delta":
-                        continue
-                    if "data:" not in chunk:
-                        continue
-                    message_data = chunk.split("data:", 1)[1].strip()
-                    if not message_data:
-                        continue
-                    try:
-                        message_json = json.loads(message_data)
-                    except json.JSONDecodeError:
-                        continue
-                    reasoning_content = message_json.get("reasoning_content")
-                    if reasoning_content:
-                        yield AgentEvent(event="message.think", data={"text": str(reasoning_content)})
-                    content = message_json.get("content")
-                    if content:
-                        yield AgentEvent(event="message.delta", data={"text": str(content)})
+        client = get_http_client(api_url)
+        async with client.stream("POST", api_url, headers=headers, json=payload, timeout=context.runtime.timeout) as response:
+            response.raise_for_status()
+            event_name: Optional[str] = None
+            async for line in response.aiter_lines():
+                chunk = line.strip()
+                if not chunk:
+                    continue
+                if chunk.startswith("event:"):
+                    event_name = chunk.split(":", 1)[1].strip()
+                    continue
+                if event_name != "conversation.message.delta":
+                    continue
+                if "data:" not in chunk:
+                    continue
+                message_data = chunk.split("data:", 1)[1].strip()
+                if not message_data:
+                    continue
+                try:
+                    message_json = json.loads(message_data)
+                except json.JSONDecodeError:
+                    continue
+                reasoning_content = message_json.get("reasoning_content")
+                if reasoning_content:
+                    yield AgentEvent(event="message.think", data={"text": str(reasoning_content)})
+                content = message_json.get("content")
+                if content:
+                    yield AgentEvent(event="message.delta", data={"text": str(content)})
 
         yield AgentEvent(event="message.done", data={})
 
@@ -284,32 +288,33 @@ class FastGPTAgentHandler(AgentHandler):
         }
 
         chat_path = _resolve_path(context.runtime, "chat", "/v1/chat/completions")
-        async with httpx.AsyncClient(timeout=context.runtime.timeout) as client:
-            async with client.stream(
-                "POST",
-                _build_url(base_url, chat_path),
-                headers=headers,
-                json=payload,
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    chunk = line.strip()
-                    if not chunk or not chunk.startswith("data:"):
-                        continue
-                    data_payload = chunk.split("data:", 1)[1].strip()
-                    if not data_payload or data_payload == "[DONE]":
-                        continue
-                    try:
-                        data = json.loads(data_payload)
-                    except json.JSONDecodeError:
-                        continue
-                    try:
-                        delta = data["choices"][0].get("delta") or {}
-                        content = delta.get("content")
-                    except (KeyError, IndexError, TypeError):
-                        content = None
-                    if content:
-                        yield AgentEvent(event="message.delta", data={"text": str(content)})
+        client = get_http_client(base_url)
+        async with client.stream(
+            "POST",
+            _build_url(base_url, chat_path),
+            headers=headers,
+            json=payload,
+            timeout=context.runtime.timeout,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                chunk = line.strip()
+                if not chunk or not chunk.startswith("data:"):
+                    continue
+                data_payload = chunk.split("data:", 1)[1].strip()
+                if not data_payload or data_payload == "[DONE]":
+                    continue
+                try:
+                    data = json.loads(data_payload)
+                except json.JSONDecodeError:
+                    continue
+                try:
+                    delta = data["choices"][0].get("delta") or {}
+                    content = delta.get("content")
+                except (KeyError, IndexError, TypeError):
+                    content = None
+                if content:
+                    yield AgentEvent(event="message.delta", data={"text": str(content)})
 
         yield AgentEvent(event="message.done", data={})
 
@@ -333,10 +338,10 @@ class CustomAgentHandler(AgentHandler):
         headers = _build_headers(context.runtime, params.get("api_key"))
         url = _build_url(base_url, normalize_path(str(conversation_path)))
 
-        async with httpx.AsyncClient(timeout=context.runtime.timeout) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client(url)
+        response = await client.post(url, headers=headers, json=payload, timeout=context.runtime.timeout)
+        response.raise_for_status()
+        data = response.json()
 
         return _extract_conversation_id(data)
 
@@ -357,11 +362,11 @@ class CustomAgentHandler(AgentHandler):
             "stream": True,
         }
 
-        async with httpx.AsyncClient(timeout=context.runtime.timeout) as client:
-            async with client.stream("POST", url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                async for event in _stream_sse_events(response):
-                    yield event
+        client = get_http_client(url)
+        async with client.stream("POST", url, headers=headers, json=payload, timeout=context.runtime.timeout) as response:
+            response.raise_for_status()
+            async for event in _stream_sse_events(response):
+                yield event
 
         yield AgentEvent(event="message.done", data={})
 
@@ -0,0 +1,110 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.cache import SingleFlight, TTLCache
+from app.core.http_utils import sanitize_config
+from app.core.settings import get_settings
+from app.services.engines import EngineRuntimeConfig
+from app.services.providers.asr import ASR_BLOCKED_CONFIG_KEYS
+
+
+class ASRResultCache:
+    def __init__(self, max_entries: int, ttl: float, max_audio_bytes: int) -> None:
+        self.ttl = ttl
+        self.max_audio_bytes = max(0, max_audio_bytes)
+        self._results: TTLCache[str, dict] = TTLCache(max_entries, ttl)
+        self._flights: SingleFlight[str, dict] = SingleFlight()
+        self.collapsed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._results.max_size > 0 and self.ttl > 0 and self.max_audio_bytes > 0
+
+    def accepts(self, size: Optional[int]) -> bool:
+        return self.enabled and size is not None and 0 < size <= self.max_audio_bytes
+
+    def key_for(self, config: EngineRuntimeConfig, digest: str, overrides: Dict[str, Any]) -> str:
+        params = dict(config.default_params or {})
+        params.update(sanitize_config(overrides, blocked=ASR_BLOCKED_CONFIG_KEYS))
+        raw = json.dumps(
+            [
+                config.id,
+                (config.engine_type or "openai_compat").lower(),
+                config.model or "",
+                config.base_url,
+                params,
+                digest,
+            ],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def transcribe(self, key: str, fn: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached, True
+        if key in self._flights:
+            self.collapsed += 1
+        return await self._flights.do(key, lambda: self._fill(key, fn)), False
+
+    def lookup(self, key: str) -> Optional[dict]:
+        return self._results.get(key)
+
+    def store(self, key: str, result: dict) -> None:
+        self._results.set(key, result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            **self._results.stats(),
+            "max_entries": self._results.max_size,
+            "ttl": self.ttl,
+            "collapsed": self.collapsed,
+            "inflight": len(self._flights),
+        }
+
+    async def _fill(self, key: str, fn: Callable[[], Awaitable[dict]]) -> dict:
+        # Failures are not cached, so a retry after an upstream error goes upstream again.
+        result = await fn()
+        self._results.set(key, result)
+        return result
+
+
+class StreamDigest:
+    def __init__(self) -> None:
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    async def wrap(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self._hash.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+
+def audio_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+async def digest_chunks(chunks: AsyncIterator[bytes]) -> str:
+    digest = StreamDigest()
+    async for _ in digest.wrap(chunks):
+        pass
+    return digest.hexdigest()
+
+
+@lru_cache
+def get_asr_cache() -> ASRResultCache:
+    settings = get_settings()
+    return ASRResultCache(
+        settings.asr_cache_max_entries,
+        settings.asr_cache_ttl,
+        settings.asr_cache_max_audio_bytes,
+    )
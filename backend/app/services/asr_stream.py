@@ -0,0 +1,328 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+from app.services.asr_window import AudioWindow, SlidingWindow, TranscriptStitcher
+from app.services.audio_buffer import PCMBuffer
+from app.services.audio_preprocess import AudioConverter, get_preprocessor, open_wav
+from app.services.engines import EngineRuntimeConfig
+from app.services.providers import asr
+from app.services.providers.asr import join_transcripts
+from app.services.socket_writer import SendJson, SocketWriter
+from app.services.vad import EnergyVAD, SpeechSegment
+
+logger = logging.getLogger(__name__)
+
+
+class ASRStreamSession:
+    def __init__(
+        self,
+        config: EngineRuntimeConfig,
+        overrides: Dict[str, Any],
+        *,
+        send_json: SendJson,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        vad: Optional[EnergyVAD] = None,
+        concurrency: int = 2,
+        partial_interval_ms: int = 0,
+        buffer: Optional[PCMBuffer] = None,
+        window: Optional[SlidingWindow] = None,
+    ) -> None:
+        self.config = config
+        self.overrides = overrides
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.vad = vad
+        self.window = window
+        self.partial_interval_ms = max(0, partial_interval_ms)
+        self._writer = SocketWriter(send_json)
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._buffer = buffer or PCMBuffer()
+        self._preprocessor = get_preprocessor(config, sample_rate, channels)
+        self._received = 0
+        self._next_seq = 0
+        self._finals: Dict[int, asyncio.Task] = {}
+        self._texts: Dict[int, str] = {}
+        self._partial: Optional[asyncio.Task] = None
+        self._partial_at = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._stitcher = self._new_stitcher()
+
+    def send_json(self, payload: Dict[str, Any]) -> None:
+        self._writer.send_json(payload)
+
+    async def feed(self, pcm: bytes) -> None:
+        self._received += len(pcm)
+        if self.window is not None:
+            for window in self.window.feed(pcm):
+                self._submit(window)
+            return
+        if self.vad is None:
+            await self._buffer.write(pcm)
+            return
+        for segment in self.vad.feed(pcm):
+            self._finalize(segment)
+        self._maybe_partial()
+
+    async def stop(self) -> None:
+        if not self._received:
+            self.send_json({"type": "error", "error": "Missing audio data."})
+            return
+        if self.window is not None:
+            tail = self.window.flush()
+            if tail is not None:
+                self._submit(tail)
+        elif self.vad is not None:
+            if self._partial is not None:
+                self._partial.cancel()
+            tail = self.vad.flush()
+            if tail is not None:
+                self._finalize(tail)
+        else:
+            result = await self._transcribe_buffer()
+            self.send_json({"type": "result", "data": result})
+            self._clear()
+            return
+
+        if self._finals:
+            await asyncio.gather(*self._finals.values(), return_exceptions=True)
+        segments = [
+            {"seq": seq, "text": self._texts.get(seq, "")} for seq in sorted(self._finals)
+        ]
+        if self.window is not None:
+            text = self._stitcher.text
+        else:
+            text = join_transcripts(segment["text"] for segment in segments)
+        self.send_json({"type": "result", "data": {"text": text, "segments": segments}})
+        self._clear()
+
+    async def reset(self) -> None:
+        await self._cancel_tasks()
+        self._writer.discard()
+        if self.vad is not None:
+            self.vad.reset()
+        if self.window is not None:
+            self.window.reset()
+        self._clear()
+
+    async def close(self) -> None:
+        await self._cancel_tasks()
+        await self._writer.close()
+        self._buffer.close()
+
+    def _finalize(self, segment: SpeechSegment) -> None:
+        seq = self._next_seq
+        self._next_seq += 1
+        self._partial_at = 0
+        self._finals[seq] = self._spawn(self._final(seq, segment))
+
+    def _submit(self, window: AudioWindow) -> None:
+        seq = self._next_seq
+        self._next_seq += 1
+        self._finals[seq] = self._spawn(self._window(seq, window))
+
+    def _maybe_partial(self) -> None:
+        if not self.partial_interval_ms or self.vad is None or not self.vad.in_speech:
+            return
+        if self._partial is not None and not self._partial.done():
+            return
+        speech_ms = self.vad.speech_ms
+        if speech_ms - self._partial_at < self.partial_interval_ms:
+            return
+        self._partial_at = speech_ms
+        self._partial = self._spawn(self._interim(self._next_seq, self.vad.current()))
+
+    async def _final(self, seq: int, segment: SpeechSegment) -> None:
+        message: Dict[str, Any] = {
+            "type": "final",
+            "seq": seq,
+            "startMs": segment.start_ms,
+            "endMs": segment.end_ms,
+        }
+        try:
+            async with self._semaphore:
+                result = await self._transcribe(segment.pcm)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("ASR segment %s failed: %s", seq, exc)
+            self._texts[seq] = ""
+            self.send_json({**message, "text": "", "error": str(exc)})
+            return
+        text = asr.extract_text(result).strip()
+        self._texts[seq] = text
+        self.send_json({**message, "text": text, "data": result})
+
+    async def _window(self, seq: int, window: AudioWindow) -> None:
+        try:
+            async with self._semaphore:
+                result = await self._transcribe(window.pcm)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("ASR window %s (%s-%sms) failed: %s", seq, window.start_ms, window.end_ms, exc)
+            text = ""
+        else:
+            text = asr.extract_text(result).strip()
+        self._texts[seq] = text
+        # Windows finish out of order; partials only advance once the earlier windows are in.
+        if self._stitcher.add(seq, text):
+            self.send_json(
+                {
+                    "type": "partial",
+                    "seq": self._stitcher.last_seq,
+                    "text": self._stitcher.text,
+                    "stable": self._stitcher.stable,
+                }
+            )
+
+    async def _interim(self, seq: int, pcm: bytes) -> None:
+        try:
+            async with self._semaphore:
+                result = await self._transcribe(pcm)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug("ASR partial for segment %s failed: %s", seq, exc)
+            return
+        # The segment may have closed meanwhile; its final result supersedes this one.
+        if seq in self._finals:
+            return
+        self.send_json({"type": "partial", "seq": seq, "text": asr.extract_text(result).strip()})
+
+    async def _transcribe(self, pcm: bytes) -> dict:
+        preprocessor = self._preprocessor
+        if not preprocessor.passthrough:
+            pcm = await asyncio.to_thread(preprocessor.process, pcm)
+        if not pcm:
+            return {"text": ""}
+        return await self._upload(asr.encode_wav_pcm16(pcm, preprocessor.sample_rate, preprocessor.channels))
+
+    async def _transcribe_buffer(self) -> dict:
+        # Streams the WAV header plus the (possibly spilled) buffer without copying it.
+        async with open_wav(self._preprocessor, self._buffer) as reader:
+            if reader is None:
+                return {"text": ""}
+            return await self._upload(reader)
+
+    async def _upload(self, audio: asr.AudioPayload) -> dict:
+        filename = self.overrides.get("filename") or "audio.wav"
+        content_type = self.overrides.get("content_type") or "audio/wav"
+        return await asr.transcribe(self.config, audio, self.overrides, filename, content_type)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _cancel_tasks(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _clear(self) -> None:
+        self._buffer.clear()
+        self._received = 0
+        self._finals.clear()
+        self._texts.clear()
+        self._partial = None
+        self._partial_at = 0
+        self._stitcher = self._new_stitcher()
+
+    def _new_stitcher(self) -> TranscriptStitcher:
+        overlap_ratio = self.window.overlap_ratio if self.window is not None else 0.0
+        return TranscriptStitcher(overlap_ratio, first_seq=self._next_seq)
+
+
+class RealtimeASRSession:
+    def __init__(
+        self,
+        config: EngineRuntimeConfig,
+        overrides: Dict[str, Any],
+        *,
+        send_json: SendJson,
+        sample_rate: int = 16000,
+        channels: int = 1,
+    ) -> None:
+        self.config = config
+        self.overrides = overrides
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._writer = SocketWriter(send_json)
+        self._client: Optional[asr.RealtimeASRClient] = None
+        self._converter: Optional[AudioConverter] = None
+        self._audio: Optional[asyncio.Queue] = None
+        self._pump: Optional[asyncio.Task] = None
+        self._next_seq = 0
+
+    def send_json(self, payload: Dict[str, Any]) -> None:
+        self._writer.send_json(payload)
+
+    async def feed(self, pcm: bytes) -> None:
+        if self._pump is None:
+            # Frames are downmixed and resampled on the fly; trimming needs the whole clip, so it is skipped.
+            self._converter = get_preprocessor(self.config, self.sample_rate, self.channels).converter()
+            self._client = asr.RealtimeASRClient(
+                self.config,
+                self.overrides,
+                sample_rate=self._converter.output_rate,
+                channels=self._converter.output_channels,
+                first_seq=self._next_seq,
+                on_message=self.send_json,
+            )
+            self._audio = asyncio.Queue()
+            self._pump = asyncio.create_task(self._run(self._client, self._audio))
+        elif self._pump.done():
+            # The upstream already failed and the error was reported; drop audio until the next stop.
+            return
+        pcm = self._converter.convert(pcm)
+        if pcm:
+            self._audio.put_nowait(pcm)
+
+    async def stop(self) -> None:
+        if self._pump is None:
+            self.send_json({"type": "error", "error": "Missing audio data."})
+            return
+        if not self._pump.done():
+            self._audio.put_nowait(None)
+        result = await asyncio.gather(self._pump, return_exceptions=True)
+        if isinstance(result[0], dict):
+            self.send_json({"type": "result", "data": result[0]})
+        await self._end()
+
+    async def reset(self) -> None:
+        await self._end()
+        self._writer.discard()
+
+    async def close(self) -> None:
+        await self._end()
+        await self._writer.close()
+
+    async def _run(self, client: asr.RealtimeASRClient, audio: asyncio.Queue) -> Optional[dict]:
+        # Frames are forwarded as they arrive; the upstream relays hypotheses through on_message.
+        try:
+            while True:
+                pcm = await audio.get()
+                if pcm is None:
+                    return await client.finish()
+                await client.send_audio(pcm)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Realtime ASR stream failed: %s", exc)
+            self.send_json({"type": "error", "error": str(exc)})
+            return None
+
+    async def _end(self) -> None:
+        pump, self._pump, self._audio = self._pump, None, None
+        if pump is not None:
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
+        client, self._client = self._client, None
+        if client is not None:
+            self._next_seq = client.next_seq
+            await client.close()
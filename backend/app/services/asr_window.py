@@ -0,0 +1,163 @@
+import math
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+_WIDE = "\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef"
+_TOKEN_RE = re.compile(rf"(\s*)([{_WIDE}]|[^\s{_WIDE}]+)")
+_KEY_RE = re.compile(r"[\W_]+")
+
+Token = Tuple[str, bool]
+
+
+@dataclass
+class AudioWindow:
+    pcm: bytes
+    start_ms: int
+    end_ms: int
+
+
+class SlidingWindow:
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        *,
+        window_ms: int = 8000,
+        overlap_ms: int = 2000,
+    ) -> None:
+        self.sample_rate = max(1, sample_rate)
+        self.channels = max(1, channels)
+        self.window_ms = max(1000, window_ms)
+        self.overlap_ms = min(max(0, overlap_ms), self.window_ms // 2)
+        self.frame_bytes = self.channels * 2
+        self.window_bytes = self._bytes(self.window_ms)
+        self.step_bytes = self.window_bytes - self._bytes(self.overlap_ms)
+        self._buffer = bytearray()
+        self._offset = 0
+        self._emitted = 0
+
+    @property
+    def overlap_ratio(self) -> float:
+        return self.overlap_ms / self.window_ms
+
+    def feed(self, pcm: bytes) -> List[AudioWindow]:
+        self._buffer.extend(pcm)
+        windows: List[AudioWindow] = []
+        while len(self._buffer) >= self.window_bytes:
+            windows.append(self._window(self.window_bytes))
+            del self._buffer[: self.step_bytes]
+            self._offset += self.step_bytes
+        return windows
+
+    def flush(self) -> Optional[AudioWindow]:
+        window = None
+        size = len(self._buffer) - len(self._buffer) % self.frame_bytes
+        # The buffer starts with the previous window's overlap; only emit if it holds new audio.
+        if self._offset + size > self._emitted:
+            window = self._window(size)
+        self.reset()
+        return window
+
+    def reset(self) -> None:
+        self._buffer.clear()
+        self._offset = 0
+        self._emitted = 0
+
+    def _window(self, size: int) -> AudioWindow:
+        self._emitted = self._offset + size
+        return AudioWindow(bytes(self._buffer[:size]), self._ms(self._offset), self._ms(self._emitted))
+
+    def _bytes(self, ms: int) -> int:
+        return self.sample_rate * ms // 1000 * self.frame_bytes
+
+    def _ms(self, size: int) -> int:
+        return size * 1000 // (self.sample_rate * self.frame_bytes)
+
+
+class TranscriptStitcher:
+    def __init__(self, overlap_ratio: float, first_seq: int = 0, min_match: int = 2) -> None:
+        self.overlap_ratio = overlap_ratio
+        self.min_match = max(1, min_match)
+        self._tokens: List[Token] = []
+        self._tail = 0
+        self._pending: Dict[int, str] = {}
+        self._next_seq = first_seq
+
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    @property
+    def text(self) -> str:
+        return render_tokens(self._tokens)
+
+    @property
+    def stable(self) -> str:
+        # The trailing tokens may still be replaced when the next window is merged.
+        return render_tokens(self._tokens[: len(self._tokens) - self._tail])
+
+    def add(self, seq: int, text: str) -> bool:
+        self._pending[seq] = text
+        merged = False
+        while self._next_seq in self._pending:
+            self._merge(self._pending.pop(self._next_seq))
+            self._next_seq += 1
+            merged = True
+        return merged
+
+    def _merge(self, text: str) -> None:
+        incoming = tokenize(text)
+        if not incoming:
+            # Nothing overlaps an empty window, so the current tail can no longer change.
+            self._tail = 0
+            return
+        reach = self._reach(incoming)
+        if not self._tokens:
+            self._tokens = incoming
+            self._tail = reach
+            return
+
+        tail_start = len(self._tokens) - self._tail
+        match = _align(self._tokens[tail_start:], incoming[:reach], self.min_match)
+        if match is None:
+            first_text, _ = incoming[0]
+            incoming[0] = (first_text, _needs_space(self.text, first_text))
+            self._tokens.extend(incoming)
+        else:
+            # Words cut at either window edge are dropped in favour of the other window's copy.
+            prev_index, next_index, size = match
+            del self._tokens[tail_start + prev_index + size :]
+            self._tokens.extend(incoming[next_index + size :])
+        self._tail = min(reach, len(self._tokens))
+
+    def _reach(self, tokens: List[Token]) -> int:
+        return min(len(tokens), max(self.min_match * 2, math.ceil(len(tokens) * self.overlap_ratio * 1.5)))
+
+
+def tokenize(text: str) -> List[Token]:
+    return [(match.group(2), bool(match.group(1))) for match in _TOKEN_RE.finditer(text)]
+
+
+def render_tokens(tokens: List[Token]) -> str:
+    return "".join((" " + text) if spaced and index else text for index, (text, spaced) in enumerate(tokens))
+
+
+def _align(previous: List[Token], incoming: List[Token], min_match: int) -> Optional[Tuple[int, int, int]]:
+    if not previous or not incoming:
+        return None
+    matcher = SequenceMatcher(None, _keys(previous), _keys(incoming), autojunk=False)
+    match = matcher.find_longest_match(0, len(previous), 0, len(incoming))
+    if match.size < min_match:
+        return None
+    return match.a, match.b, match.size
+
+
+def _keys(tokens: List[Token]) -> list:
+    # Punctuation-only tokens get a unique key so they never anchor an alignment.
+    return [_KEY_RE.sub("", text).lower() or object() for text, _ in tokens]
+
+
+def _needs_space(previous: str, following: str) -> bool:
+    return bool(previous) and bool(following) and (previous[-1].isascii() or following[0].isascii())
@@ -0,0 +1,132 @@
+import asyncio
+import io
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+from app.services.providers.asr import wav_header
+
+
+class PCMBuffer:
+    def __init__(self, max_memory_bytes: int = 4 * 1024 * 1024, directory: Optional[str] = None) -> None:
+        self.max_memory_bytes = max(0, max_memory_bytes)
+        self.directory = directory or None
+        self._memory = bytearray()
+        self._file: Optional[BinaryIO] = None
+        self._spilled = 0
+        self._spilling = bytearray()
+        self._spill_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._spilling) + len(self._memory)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @property
+    def spilled(self) -> int:
+        return self._spilled
+
+    def extend(self, data: bytes) -> None:
+        self._memory.extend(data)
+        if len(self._memory) > self.max_memory_bytes:
+            self._write_spill(self._memory)
+            self._spilled += len(self._memory)
+            self._memory = bytearray()
+
+    async def write(self, data: bytes) -> None:
+        # Same as extend, but the disk write runs off the event loop.
+        self._memory.extend(data)
+        if len(self._memory) <= self.max_memory_bytes:
+            return
+        async with self._spill_lock:
+            if len(self._memory) <= self.max_memory_bytes:
+                return
+            # Frames that arrive during the write land in a fresh buffer behind this one.
+            self._spilling, self._memory = self._memory, bytearray()
+            try:
+                await asyncio.to_thread(self._write_spill, self._spilling)
+            except BaseException:
+                self._memory = self._spilling + self._memory
+                raise
+            else:
+                self._spilled += len(self._spilling)
+            finally:
+                self._spilling = bytearray()
+
+    async def settle(self) -> None:
+        async with self._spill_lock:
+            pass
+
+    def readinto_at(self, offset: int, target: memoryview) -> int:
+        if offset < self._spilled:
+            self._file.seek(offset)
+            size = min(len(target), self._spilled - offset)
+            return self._file.readinto(target[:size])
+        start = offset - self._spilled
+        if start < len(self._spilling):
+            size = min(len(target), len(self._spilling) - start)
+            target[:size] = self._spilling[start : start + size]
+            return size
+        start -= len(self._spilling)
+        size = max(0, min(len(target), len(self._memory) - start))
+        target[:size] = memoryview(self._memory)[start : start + size]
+        return size
+
+    def wav_reader(self, sample_rate: int, channels: int) -> "WavReader":
+        return WavReader(self, sample_rate, channels)
+
+    def clear(self) -> None:
+        self.close()
+        self._memory = bytearray()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._spilled = 0
+
+    def _write_spill(self, data: bytearray) -> None:
+        # Older audio moves to disk; only the most recent chunk stays in memory.
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self.directory)
+        self._file.seek(self._spilled)
+        self._file.write(data)
+
+
+class WavReader(io.RawIOBase):
+    def __init__(self, buffer: PCMBuffer, sample_rate: int, channels: int) -> None:
+        self._buffer = buffer
+        self._header = wav_header(len(buffer), sample_rate, channels)
+        self._size = len(self._header) + len(buffer)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._position = max(0, min(offset, self._size))
+        return self._position
+
+    def readinto(self, target) -> int:
+        view = memoryview(target).cast("B")
+        header_size = len(self._header)
+        if self._position >= self._size or not len(view):
+            return 0
+        if self._position < header_size:
+            size = min(len(view), header_size - self._position)
+            view[:size] = self._header[self._position : self._position + size]
+        else:
+            size = self._buffer.readinto_at(self._position - header_size, view)
+        self._position += size
+        return size
@@ -0,0 +1,263 @@
+import asyncio
+import sys
+from array import array
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.core.settings import get_settings
+from app.services.audio_buffer import PCMBuffer, WavReader
+from app.services.engines import AudioPreferences, EngineRuntimeConfig
+from app.services.vad import frame_levels
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+TRIM_FRAME_MS = 10
+SCAN_CHUNK_MS = 1000
+
+
+class AudioConverter:
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        *,
+        target_rate: int = 0,
+        target_channels: int = 0,
+    ) -> None:
+        self.sample_rate = max(1, sample_rate)
+        self.channels = max(1, channels)
+        # Only ever reduce: upsampling or upmixing would add bytes without adding information.
+        self.output_rate = target_rate if 0 < target_rate < self.sample_rate else self.sample_rate
+        self.output_channels = 1 if target_channels == 1 else self.channels
+        self.frame_bytes = self.channels * 2
+        self._factor = self.sample_rate // self.output_rate if self.sample_rate % self.output_rate == 0 else 0
+        self._pending = b""
+        self._carry = None
+        self._in_pos = 0
+        self._out_pos = 0
+
+    @property
+    def passthrough(self) -> bool:
+        return self.output_rate == self.sample_rate and self.output_channels == self.channels
+
+    def convert(self, pcm: bytes) -> bytes:
+        if self.passthrough:
+            return pcm
+        data = self._pending + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return b""
+        frames = _decode(data[:usable], self.channels)
+        if self.output_channels == 1 and self.channels > 1:
+            frames = _downmix(frames)
+        if self.output_rate != self.sample_rate:
+            frames = self._resample(frames)
+        return _encode(frames)
+
+    def _resample(self, frames):
+        if self._carry is not None:
+            frames = _concat(self._carry, frames)
+        count = _length(frames)
+        if self._factor:
+            # Integer ratios average each block, which also acts as a crude low-pass filter.
+            usable = count - count % self._factor
+            self._carry = _slice(frames, usable, count)
+            return _block_mean(_slice(frames, 0, usable), self._factor)
+        # Other ratios interpolate linearly; the last input frame is kept to bridge the next chunk.
+        last = (self._in_pos + count - 1) * self.output_rate // self.sample_rate
+        positions = _positions(self._out_pos, last + 1, self._in_pos, self.sample_rate, self.output_rate)
+        self._out_pos = last + 1
+        self._in_pos += count - 1
+        self._carry = _slice(frames, count - 1, count)
+        return _interpolate(frames, positions)
+
+
+class AudioPreprocessor:
+    def __init__(
+        self,
+        preferences: Optional[AudioPreferences],
+        sample_rate: int = 16000,
+        channels: int = 1,
+        *,
+        trim_threshold: float = 300.0,
+        trim_padding_ms: int = 200,
+    ) -> None:
+        preferences = preferences or AudioPreferences()
+        self.input_rate = max(1, sample_rate)
+        self.input_channels = max(1, channels)
+        self.trim = preferences.trim_silence and trim_threshold > 0
+        self.trim_threshold = trim_threshold
+        self.trim_padding_ms = max(0, trim_padding_ms)
+        self._target_rate = preferences.sample_rate
+        self._target_channels = preferences.channels
+        probe = self.converter()
+        self.sample_rate = probe.output_rate
+        self.channels = probe.output_channels
+
+    @property
+    def passthrough(self) -> bool:
+        return not self.trim and self.converter().passthrough
+
+    def process(self, pcm: bytes) -> bytes:
+        if self.passthrough:
+            return pcm
+        if self.trim:
+            levels = frame_levels(pcm, self._trim_frame_bytes)
+            start, end = self._trim_bounds(levels)
+            pcm = pcm[start:end]
+        return self.converter().convert(pcm)
+
+    def process_buffer(self, buffer: PCMBuffer) -> PCMBuffer:
+        # Two passes over the (possibly spilled) buffer keep memory bounded by one scan chunk.
+        start, end = 0, len(buffer)
+        if self.trim:
+            levels: List[float] = []
+            for chunk in _read_chunks(buffer, 0, end, self._scan_chunk_bytes):
+                levels.extend(frame_levels(chunk, self._trim_frame_bytes))
+            start, end = self._trim_bounds(levels)
+        output = PCMBuffer(buffer.max_memory_bytes, buffer.directory)
+        converter = self.converter()
+        for chunk in _read_chunks(buffer, start, end, self._scan_chunk_bytes):
+            output.extend(converter.convert(chunk))
+        return output
+
+    @property
+    def _trim_frame_bytes(self) -> int:
+        return max(1, self.input_rate * TRIM_FRAME_MS // 1000) * self.input_channels * 2
+
+    @property
+    def _scan_chunk_bytes(self) -> int:
+        return self._trim_frame_bytes * (SCAN_CHUNK_MS // TRIM_FRAME_MS)
+
+    def converter(self) -> AudioConverter:
+        return AudioConverter(
+            self.input_rate,
+            self.input_channels,
+            target_rate=self._target_rate,
+            target_channels=self._target_channels,
+        )
+
+    def _trim_bounds(self, levels: List[float]) -> Tuple[int, int]:
+        voiced = [index for index, level in enumerate(levels) if level >= self.trim_threshold]
+        if not voiced:
+            return 0, 0
+        padding = self.trim_padding_ms // TRIM_FRAME_MS
+        first = max(0, voiced[0] - padding)
+        last = min(len(levels), voiced[-1] + 1 + padding)
+        return first * self._trim_frame_bytes, last * self._trim_frame_bytes
+
+
+def get_preprocessor(config: EngineRuntimeConfig, sample_rate: int, channels: int) -> AudioPreprocessor:
+    settings = get_settings()
+    preferences = config.audio if settings.asr_preprocess_enabled else None
+    return AudioPreprocessor(preferences, sample_rate, channels, trim_threshold=settings.asr_trim_threshold)
+
+
+@asynccontextmanager
+async def open_wav(preprocessor: AudioPreprocessor, buffer: PCMBuffer) -> AsyncIterator[Optional[WavReader]]:
+    await buffer.settle()
+    processed = buffer
+    if not preprocessor.passthrough:
+        processed = await asyncio.to_thread(preprocessor.process_buffer, buffer)
+    try:
+        if not processed:
+            yield None
+            return
+        with processed.wav_reader(preprocessor.sample_rate, preprocessor.channels) as reader:
+            yield reader
+    finally:
+        if processed is not buffer:
+            processed.close()
+
+
+def _read_chunks(buffer: PCMBuffer, start: int, end: int, size: int):
+    chunk = bytearray(size)
+    view = memoryview(chunk)
+    offset = start
+    while offset < end:
+        count = buffer.readinto_at(offset, view[: min(size, end - offset)])
+        if not count:
+            break
+        offset += count
+        yield bytes(view[:count])
+
+
+def _decode(pcm: bytes, channels: int):
+    if np is not None:
+        return np.frombuffer(pcm, dtype="<i2").astype(np.float32).reshape(-1, channels)
+    samples = array("h")
+    samples.frombytes(pcm)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return [samples[channel::channels] for channel in range(channels)]
+
+
+def _encode(frames) -> bytes:
+    if np is not None:
+        return np.clip(np.rint(frames), -32768, 32767).astype("<i2").tobytes()
+    channels = len(frames)
+    samples = array("h", bytes(2 * channels * _length(frames)))
+    for channel, column in enumerate(frames):
+        samples[channel::channels] = array("h", (max(-32768, min(32767, round(value))) for value in column))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def _length(frames) -> int:
+    return len(frames) if np is not None else len(frames[0])
+
+
+def _slice(frames, start: int, end: int):
+    if np is not None:
+        return frames[start:end]
+    return [column[start:end] for column in frames]
+
+
+def _concat(head, tail):
+    if np is not None:
+        return np.concatenate([head, tail])
+    return [list(first) + list(second) for first, second in zip(head, tail)]
+
+
+def _downmix(frames):
+    if np is not None:
+        return frames.mean(axis=1, keepdims=True)
+    return [[sum(values) / len(frames) for values in zip(*frames)]]
+
+
+def _block_mean(frames, factor: int):
+    if np is not None:
+        return frames.reshape(-1, factor, frames.shape[1]).mean(axis=1)
+    return [
+        [sum(column[start : start + factor]) / factor for start in range(0, len(column), factor)]
+        for column in frames
+    ]
+
+
+def _positions(first: int, stop: int, offset: int, input_rate: int, output_rate: int):
+    if np is not None:
+        indices = np.arange(first, stop, dtype=np.int64)
+        return (indices * input_rate - offset * output_rate) / output_rate
+    return [(index * input_rate - offset * output_rate) / output_rate for index in range(first, stop)]
+
+
+def _interpolate(frames, positions):
+    if np is not None:
+        indices = np.arange(len(frames))
+        columns = [np.interp(positions, indices, frames[:, channel]) for channel in range(frames.shape[1])]
+        return np.stack(columns, axis=1)
+    columns = []
+    for column in frames:
+        last = len(column) - 1
+        values = []
+        for position in positions:
+            index = min(int(position), last)
+            following = column[min(index + 1, last)]
+            values.append(column[index] + (following - column[index]) * (position - index))
+        columns.append(values)
+    return columns
@@ -1,5 +1,5 @@
 from .registry import registry
-from .runtime_store import EngineRuntimeConfig, store as runtime_store
+from .runtime_store import AudioPreferences, EngineRuntimeConfig, store as runtime_store
 from .types import EngineParamSpec, EngineSpec
 
 __all__ = [
@@ -8,4 +8,5 @@ __all__ = [
     "EngineSpec",
     "EngineParamSpec",
     "EngineRuntimeConfig",
+    "AudioPreferences",
 ]
@@ -4,6 +4,7 @@ from typing import Dict, Optional
 import httpx
 
 from app.services.engines.runtime_store import EngineRuntimeConfig
+from app.core.http_clients import get_http_client
 from app.core.http_utils import normalize_path, resolve_api_key
 
 
@@ -27,8 +28,8 @@ async def check_engine_health(
     url = base_url.rstrip("/") + path
 
     try:
-        async with httpx.AsyncClient(timeout=config.timeout) as client:
-            response = await client.get(url, headers=headers)
+        client = get_http_client(url)
+        response = await client.get(url, headers=headers, timeout=config.timeout)
         latency_ms = (time.monotonic() - start) * 1000
         if response.status_code >= 400:
             return {
@@ -1,11 +1,19 @@
 import os
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import yaml
 
+from app.core.http_clients import http_clients, parse_pool_config
 from app.core.settings import get_settings
-from app.services.engines import EngineParamSpec, EngineRuntimeConfig, EngineSpec, registry, runtime_store
+from app.services.engines import (
+    AudioPreferences,
+    EngineParamSpec,
+    EngineRuntimeConfig,
+    EngineSpec,
+    registry,
+    runtime_store,
+)
 
 
 def bootstrap_engines() -> None:
@@ -70,6 +78,9 @@ def _load_llm_engines(config: Dict[str, Any]) -> None:
         headers = engine.get("headers") if isinstance(engine.get("headers"), dict) else {}
         timeout = _as_float(engine.get("timeout"), 60.0)
         default_params = _parse_defaults(engine, params)
+        pool = parse_pool_config(engine.get("pool"))
+        if pool and base_url:
+            http_clients.configure(base_url, pool)
 
         runtime_store.register(
             "llm",
@@ -83,6 +94,7 @@ def _load_llm_engines(config: Dict[str, Any]) -> None:
                 default_params=default_params,
                 engine_type=engine_type,
                 paths=_parse_paths(engine.get("paths")),
+                pool=pool,
             ),
         )
 
@@ -122,6 +134,9 @@ def _load_tts_engines(config: Dict[str, Any]) -> None:
         headers = engine.get("headers") if isinstance(engine.get("headers"), dict) else {}
         timeout = _as_float(engine.get("timeout"), 60.0)
         default_params = _parse_defaults(engine, params)
+        pool = parse_pool_config(engine.get("pool"))
+        if pool and base_url:
+            http_clients.configure(base_url, pool)
 
         runtime_store.register(
             "tts",
@@ -135,6 +150,9 @@ def _load_tts_engines(config: Dict[str, Any]) -> None:
                 default_params=default_params,
                 engine_type=engine_type,
                 paths=_parse_paths(engine.get("paths")),
+                pool=pool,
+                max_text_chars=_as_int(engine.get("max_text_chars"), 0),
+                parallelism=_as_int(engine.get("parallelism"), 0),
             ),
         )
 
@@ -174,6 +192,9 @@ def _load_asr_engines(config: Dict[str, Any]) -> None:
         headers = engine.get("headers") if isinstance(engine.get("headers"), dict) else {}
         timeout = _as_float(engine.get("timeout"), 60.0)
         default_params = _parse_defaults(engine, params)
+        pool = parse_pool_config(engine.get("pool"))
+        if pool and base_url:
+            http_clients.configure(base_url, pool)
 
         runtime_store.register(
             "asr",
@@ -187,6 +208,8 @@ def _load_asr_engines(config: Dict[str, Any]) -> None:
                 default_params=default_params,
                 engine_type=engine_type,
                 paths=_parse_paths(engine.get("paths")),
+                pool=pool,
+                audio=_parse_audio_preferences(engine.get("audio")),
             ),
         )
 
@@ -225,6 +248,9 @@ def _load_agent_engines(config: Dict[str, Any]) -> None:
         headers = engine.get("headers") if isinstance(engine.get("headers"), dict) else {}
         timeout = _as_float(engine.get("timeout"), 60.0)
         default_params = _parse_defaults(engine, params)
+        pool = parse_pool_config(engine.get("pool"))
+        if pool and base_url:
+            http_clients.configure(base_url, pool)
 
         runtime_store.register(
             "agent",
@@ -238,6 +264,7 @@ def _load_agent_engines(config: Dict[str, Any]) -> None:
                 default_params=default_params,
                 engine_type=engine_type,
                 paths=_parse_paths(engine.get("paths")),
+                pool=pool,
             ),
         )
 
@@ -283,6 +310,16 @@ def _parse_paths(value: Any) -> Dict[str, str]:
     return {str(k): str(v) for k, v in value.items() if v is not None}
 
 
+def _parse_audio_preferences(value: Any) -> Optional[AudioPreferences]:
+    if not isinstance(value, dict):
+        return None
+    return AudioPreferences(
+        sample_rate=_as_int(value.get("sample_rate") or value.get("sampleRate"), 0),
+        channels=_as_int(value.get("channels"), 0),
+        trim_silence=bool(value.get("trim_silence") or value.get("trimSilence")),
+    )
+
+
 def _parse_metadata(engine: Dict[str, Any], engine_type: str) -> Dict[str, Any]:
     metadata = engine.get("metadata") if isinstance(engine.get("metadata"), dict) else {}
     capabilities = engine.get("capabilities")
@@ -306,3 +343,12 @@ def _as_float(value: Any, fallback: float) -> float:
         return float(value)
     except (TypeError, ValueError):
         return fallback
+
+
+def _as_int(value: Any, fallback: int) -> int:
+    if value is None:
+        return fallback
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return fallback
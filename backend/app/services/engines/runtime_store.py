@@ -1,6 +1,15 @@
 from dataclasses import dataclass, field
 from typing import Any, Dict, Optional
 
+from app.core.http_clients import HttpPoolConfig
+
+
+@dataclass
+class AudioPreferences:
+    sample_rate: int = 0
+    channels: int = 0
+    trim_silence: bool = False
+
 
 @dataclass
 class EngineRuntimeConfig:
@@ -13,6 +22,10 @@ class EngineRuntimeConfig:
     default_params: Dict[str, Any] = field(default_factory=dict)
     engine_type: str = "openai_compat"
     paths: Dict[str, str] = field(default_factory=dict)
+    pool: Optional[HttpPoolConfig] = None
+    max_text_chars: int = 0
+    parallelism: int = 0
+    audio: Optional[AudioPreferences] = None
 
 
 class EngineRuntimeStore:
@@ -1,4 +1,8 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import inspect
+from collections import deque
+from contextlib import aclosing, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
 
 from app.core.settings import get_settings
 from app.core.events import EventEnvelope, make_event
@@ -11,6 +15,7 @@ from app.services.providers.llm import (
 )
 from app.services.providers.types import build_provider_config
 from app.services.session_store import SessionStore
+from app.services.voice_pipeline import VoiceCapture, VoicePipeline
 
 
 class EventDispatcher:
@@ -18,6 +23,10 @@ class EventDispatcher:
         self.memory = MemoryService()
         self.llm: Optional[LLMProvider] = None
         self.sessions = SessionStore()
+        self._turns: Dict[str, asyncio.Task] = {}
+        self.voice = VoicePipeline()
+        self._captures: Dict[str, VoiceCapture] = {}
+        self._ended: Dict[str, Deque[VoiceCapture]] = {}
 
         self._event_aliases = {
             "user.text": "input.text",
@@ -33,6 +42,8 @@ class EventDispatcher:
             "input.voice.end": self.handle_input_voice_end,
             "input.interrupt": self.handle_input_interrupt,
         }
+        self._turn_events = {"input.text", "input.voice.end"}
+        self._inline_events = {"input.interrupt", "input.voice.start", "input.voice.chunk"}
 
     def _ensure_llm(self) -> LLMProvider:
         if self.llm is None:
@@ -101,12 +112,92 @@ class EventDispatcher:
     def _normalize_type(self, event_type: str) -> str:
         return self._event_aliases.get(event_type, event_type)
 
+    def resolve_session_id(self, event: EventEnvelope) -> str:
+        return self._resolve_session_id(event.data, event.session_id)
+
+    def runs_inline(self, event: EventEnvelope) -> bool:
+        # Capture bookkeeping must not queue behind a running turn, or barge-in audio is lost.
+        return self._normalize_type(event.type) in self._inline_events
+
+    def end_capture(self, event: EventEnvelope) -> bool:
+        session_id = self.resolve_session_id(event)
+        capture = self._captures.pop(session_id, None)
+        if capture is None:
+            return False
+        self._ended.setdefault(session_id, deque()).append(capture)
+        return True
+
+    def discard_ended_capture(self, session_id: str) -> None:
+        ended = self._ended.get(session_id)
+        if not ended:
+            return
+        ended.pop().close()
+        if not ended:
+            self._ended.pop(session_id, None)
+
+    def _take_ended_capture(self, session_id: str) -> Optional[VoiceCapture]:
+        ended = self._ended.get(session_id)
+        if not ended:
+            return None
+        capture = ended.popleft()
+        if not ended:
+            self._ended.pop(session_id, None)
+        return capture
+
+    def release_session(self, session_id: str) -> None:
+        self.cancel_turn(session_id)
+        capture = self._captures.pop(session_id, None)
+        if capture is not None:
+            capture.close()
+        for capture in self._ended.pop(session_id, ()):
+            capture.close()
+
+    def cancel_turn(self, session_id: str) -> bool:
+        task = self._turns.pop(session_id, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    @contextmanager
+    def _track_turn(self, session_id: str) -> Iterator[None]:
+        task = asyncio.current_task()
+        if task is None:
+            yield
+            return
+        self._turns[session_id] = task
+        try:
+            yield
+        finally:
+            if self._turns.get(session_id) is task:
+                self._turns.pop(session_id, None)
+
     async def dispatch(self, event: EventEnvelope) -> List[Dict[str, Any]]:
+        return [response async for response in self.stream(event)]
+
+    async def stream(self, event: EventEnvelope) -> AsyncIterator[Dict[str, Any]]:
         normalized = self._normalize_type(event.type)
         handler = self._handlers.get(normalized)
         if handler is None:
-            return []
-        return await handler(event)
+            return
+        if normalized in self._turn_events:
+            with self._track_turn(self.resolve_session_id(event)):
+                async for response in self._run_handler(handler, event):
+                    yield response
+            return
+        async for response in self._run_handler(handler, event):
+            yield response
+
+    @staticmethod
+    async def _run_handler(handler, event: EventEnvelope) -> AsyncIterator[Dict[str, Any]]:
+        result = handler(event)
+        if inspect.isasyncgen(result):
+            async with aclosing(result) as responses:
+                async for response in responses:
+                    yield response
+            return
+        for response in await result:
+            yield response
 
     async def handle_session_start(self, event: EventEnvelope) -> List[Dict[str, Any]]:
         payload = event.data
@@ -128,13 +219,21 @@ class EventDispatcher:
             )
         ]
 
-    async def handle_input_text(self, event: EventEnvelope) -> List[Dict[str, Any]]:
+    async def handle_input_text(self, event: EventEnvelope) -> AsyncIterator[Dict[str, Any]]:
         payload = event.data
         text = payload.get("text", "")
         if not isinstance(text, str) or not text:
-            return [make_event("error", {"message": "input.text requires a text field"}, session_id=event.session_id)]
+            yield make_event("error", {"message": "input.text requires a text field"}, session_id=event.session_id)
+            return
 
         session_id = self._resolve_session_id(payload, event.session_id)
+        async with aclosing(self._chat_turn(session_id, text, payload)) as responses:
+            async for response in responses:
+                yield response
+
+    async def _chat_turn(
+        self, session_id: str, text: str, payload: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
         session = self.sessions.get_or_create(
             session_id,
             user_id=payload.get("user_id"),
@@ -154,6 +253,7 @@ class EventDispatcher:
         memory_scope = self._build_memory_scope(session_id, session.user_id, session.profile_id)
         memory_context = self.memory.build_context(memory_scope)
 
+        chunks: List[str] = []
         try:
             if payload.get("provider"):
                 llm = build_llm_provider_from_config(provider_config)
@@ -176,56 +276,53 @@ class EventDispatcher:
                     session_meta=session_meta,
                     developer_prompt=developer_prompt,
                 )
-            if provider in {"openai", "openai_compat", "openai-compatible"}:
-                deltas = await llm.stream(
-                    text=text_payload,
-                    user_id=payload.get("user_id"),
-                    conversation_id=conversation_id,
-                    messages=messages,
-                )
-                response_text = "".join(deltas)
-                response_conversation_id = conversation_id
-            else:
-                response = await llm.generate(
-                    text=text_payload,
-                    user_id=payload.get("user_id"),
-                    conversation_id=conversation_id,
-                    messages=messages,
-                )
-                response_text = response.text
-                response_conversation_id = response.conversation_id or conversation_id
-                deltas = [response_text]
+            response_conversation_id = conversation_id
+            deltas = llm.stream(
+                text=text_payload,
+                user_id=payload.get("user_id"),
+                conversation_id=conversation_id,
+                messages=messages,
+            )
+            async with aclosing(deltas):
+                async for delta in deltas:
+                    if delta.conversation_id:
+                        response_conversation_id = delta.conversation_id
+                    if not delta.text:
+                        continue
+                    chunks.append(delta.text)
+                    for delta_event in self._delta_events(delta.text, session_id):
+                        yield delta_event
         except LLMConfigError as exc:
-            return [make_event("error", {"message": str(exc)}, session_id=session_id)]
+            yield make_event("error", {"message": str(exc)}, session_id=session_id)
+            return
         except Exception as exc:
-            return [make_event("error", {"message": f"LLM request failed: {exc}"}, session_id=session_id)]
+            yield make_event("error", {"message": f"LLM request failed: {exc}"}, session_id=session_id)
+            return
 
+        response_text = "".join(chunks)
         if response_conversation_id and response_conversation_id != conversation_id:
             self.sessions.set_conversation_id(
                 session_id, provider, response_conversation_id
             )
         self.memory.record_message(memory_scope, "user", text)
         self.memory.record_message(memory_scope, "assistant", response_text)
-        await self.memory.maybe_summarize(memory_scope, provider=llm)
-
-        events = []
-        for delta in deltas:
-            if not delta:
-                continue
-            events.append(make_event("output.chat.delta", {"text": delta}, session_id=session_id))
-            events.append(make_event("llm.delta", {"text": delta}, session_id=session_id))
 
         final_payload = {"text": response_text, "tokens": len(response_text.split())}
-        events.append(make_event("output.chat.complete", final_payload, session_id=session_id))
-        events.append(make_event("llm.final", final_payload, session_id=session_id))
-        events.append(
-            make_event(
-                "memory.write",
-                {"kind": "chat", "content": text, "tags": ["user"]},
-                session_id=session_id,
-            )
+        yield make_event("output.chat.complete", final_payload, session_id=session_id)
+        yield make_event("llm.final", final_payload, session_id=session_id)
+        yield make_event(
+            "memory.write",
+            {"kind": "chat", "content": text, "tags": ["user"]},
+            session_id=session_id,
         )
-        return events
+        await self.memory.maybe_summarize(memory_scope, provider=llm)
+
+    @staticmethod
+    def _delta_events(delta: str, session_id: str) -> List[Dict[str, Any]]:
+        return [
+            make_event("output.chat.delta", {"text": delta}, session_id=session_id),
+            make_event("llm.delta", {"text": delta}, session_id=session_id),
+        ]
 
     @staticmethod
     def _build_memory_scope(
@@ -238,16 +335,62 @@ class EventDispatcher:
         )
 
     async def handle_input_voice_chunk(self, event: EventEnvelope) -> List[Dict[str, Any]]:
-        return [make_event("error", {"message": "ASR not configured"}, session_id=event.session_id)]
+        session_id = self.resolve_session_id(event)
+        capture = self._captures.get(session_id)
+        if capture is None:
+            return [
+                make_event(
+                    "error",
+                    {"message": "input.voice.start required before audio chunks"},
+                    session_id=session_id,
+                )
+            ]
+        audio = event.data.get("audio")
+        if not isinstance(audio, (bytes, bytearray)):
+            return [
+                make_event("error", {"message": "input.voice.chunk requires binary audio"}, session_id=session_id)
+            ]
+        already_truncated = capture.truncated
+        if await capture.append(bytes(audio)) or already_truncated:
+            return []
+        return [
+            make_event(
+                "error",
+                {"message": f"Voice input exceeds {self.voice.max_seconds} seconds; audio truncated"},
+                session_id=session_id,
+            )
+        ]
 
     async def handle_input_voice_start(self, event: EventEnvelope) -> List[Dict[str, Any]]:
+        session_id = self.resolve_session_id(event)
+        previous = self._captures.pop(session_id, None)
+        if previous is not None:
+            previous.close()
+        self._captures[session_id] = self.voice.create_capture(event.data)
         return []
 
-    async def handle_input_voice_end(self, event: EventEnvelope) -> List[Dict[str, Any]]:
-        return []
+    async def handle_input_voice_end(self, event: EventEnvelope) -> AsyncIterator[Dict[str, Any]]:
+        session_id = self.resolve_session_id(event)
+        capture = self._take_ended_capture(session_id)
+        if capture is None:
+            yield make_event(
+                "error",
+                {"message": "input.voice.start required before input.voice.end"},
+                session_id=session_id,
+            )
+            return
+        payload = {**capture.payload, **event.data}
+
+        def chat(text: str) -> AsyncIterator[Dict[str, Any]]:
+            return self._chat_turn(session_id, text, payload)
+
+        async with aclosing(self.voice.run(session_id, capture, chat)) as responses:
+            async for response in responses:
+                yield response
 
     async def handle_input_interrupt(self, event: EventEnvelope) -> List[Dict[str, Any]]:
+        interrupted = self.cancel_turn(self.resolve_session_id(event))
         return [
-            make_event("output.speech.end", {}, session_id=event.session_id),
-            make_event("tts.end", {}, session_id=event.session_id),
+            make_event("output.speech.end", {"interrupted": interrupted}, session_id=event.session_id),
+            make_event("tts.end", {"interrupted": interrupted}, session_id=event.session_id),
         ]
@@ -1,3 +1,476 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import struct
+import tempfile
+import wave
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import httpx
+
+from app.core.http_clients import get_http_client
+from app.core.http_utils import normalize_path, resolve_api_key, sanitize_config, websocket_url
+from app.services.engines import EngineRuntimeConfig, registry, runtime_store
+
+try:
+    import websockets
+    from websockets.asyncio.client import connect as websocket_connect
+except ImportError:  # pragma: no cover - optional dependency
+    websockets = None
+    websocket_connect = None
+
+logger = logging.getLogger(__name__)
+
+ASR_BLOCKED_CONFIG_KEYS = frozenset(
+    {
+        "api_key",
+        "apiKey",
+        "base_url",
+        "baseUrl",
+        "engine",
+        "filename",
+        "file_name",
+        "file",
+        "content_type",
+        "mime_type",
+    }
+)
+
+
+@dataclass
+class AudioStream:
+    chunks: AsyncIterator[bytes]
+    size: Optional[int] = None
+
+
+AudioPayload = Union[bytes, BinaryIO, AudioStream]
+
+REALTIME_ENGINE_TYPES = frozenset({"realtime_asr", "realtime"})
+
+
+class ASRConfigError(ValueError):
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
 class ASRProvider:
     def transcribe(self, audio: bytes) -> str:
         raise NotImplementedError
+
+
+def resolve_engine_id(engine_id: str) -> str:
+    if engine_id == "default":
+        default_spec = registry.get_default("asr")
+        return default_spec.id if default_spec else ""
+    return engine_id
+
+
+def get_engine_config(engine_id: str) -> EngineRuntimeConfig:
+    if not engine_id:
+        raise ASRConfigError("Missing engine id")
+    config = runtime_store.get("asr", engine_id)
+    if not config or not config.base_url:
+        raise ASRConfigError("ASR engine not configured", status_code=404)
+    engine_type = (config.engine_type or "openai_compat").lower()
+    if engine_type not in {"dify_asr", "coze_asr", "dify", "coze", *REALTIME_ENGINE_TYPES} and not config.model:
+        raise ASRConfigError("ASR engine missing model")
+    return config
+
+
+async def transcribe(
+    config: EngineRuntimeConfig,
+    audio_bytes: AudioPayload,
+    overrides: Optional[Dict[str, Any]],
+    filename: str,
+    content_type: str,
+) -> dict:
+    engine_type = (config.engine_type or "openai_compat").lower()
+    if engine_type in REALTIME_ENGINE_TYPES:
+        return await forward_realtime_transcription(config, audio_bytes, overrides or {})
+    if engine_type in {"dify_asr", "dify"}:
+        return await forward_dify_transcription(config, audio_bytes, overrides or {}, filename, content_type)
+    if engine_type in {"coze_asr", "coze"}:
+        return await forward_coze_transcription(config, audio_bytes, overrides or {}, filename, content_type)
+    return await forward_transcription(config, audio_bytes, overrides, filename, content_type)
+
+
+def is_realtime(config: EngineRuntimeConfig) -> bool:
+    return (config.engine_type or "").lower() in REALTIME_ENGINE_TYPES
+
+
+def encode_wav_pcm16(pcm_bytes: bytes, sample_rate: int, channels: int) -> bytes:
+    return wav_header(len(pcm_bytes), sample_rate, channels) + pcm_bytes
+
+
+def wav_header(data_size: int, sample_rate: int, channels: int) -> bytes:
+    channels = max(1, channels)
+    block_align = channels * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        16,
+        b"data",
+        data_size,
+    )
+
+
+async def forward_transcription(
+    config: EngineRuntimeConfig,
+    audio_bytes: AudioPayload,
+    overrides: Optional[Dict[str, Any]],
+    filename: str,
+    content_type: str,
+) -> dict:
+    headers = {}
+    headers.update(config.headers)
+    api_key = resolve_api_key(config.api_key_env)
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+
+    data: Dict[str, Any] = {"model": config.model}
+    data.update(config.default_params)
+    if isinstance(overrides, dict):
+        data.update(sanitize_config(overrides, blocked=ASR_BLOCKED_CONFIG_KEYS))
+
+    transcription_path = config.paths.get("transcription") if config.paths else None
+    path = normalize_path(transcription_path or "/audio/transcriptions")
+    url = config.base_url.rstrip("/") + path
+
+    response = await _post_audio(url, headers, data, filename, audio_bytes, content_type, config.timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def _merge_params(config: EngineRuntimeConfig, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(config.default_params or {})
+    merged.update(sanitize_config(overrides, blocked=ASR_BLOCKED_CONFIG_KEYS))
+    return merged
+
+
+async def forward_dify_transcription(
+    config: EngineRuntimeConfig,
+    audio_bytes: AudioPayload,
+    overrides: Dict[str, Any],
+    filename: str,
+    content_type: str,
+) -> dict:
+    params = _merge_params(config, overrides)
+    api_server = params.get("api_server") or config.base_url
+    api_key = params.get("api_key") or resolve_api_key(config.api_key_env)
+    username = params.get("username") or params.get("user")
+
+    if not api_server or not api_key:
+        raise ASRConfigError("Dify ASR missing API server or key")
+
+    headers = {"Authorization": f"Bearer {api_key}"}
+    headers.update(config.headers)
+    data: Dict[str, Any] = {}
+    if username:
+        data["user"] = username
+
+    transcription_path = config.paths.get("transcription") if config.paths else None
+    path = normalize_path(transcription_path or "/audio-to-text")
+    url = api_server.rstrip("/") + path
+
+    response = await _post_audio(url, headers, data, filename, audio_bytes, content_type, config.timeout)
+    response.raise_for_status()
+    payload = response.json()
+    text = extract_text(payload)
+    return {"text": text} if text else payload
+
+
+async def forward_coze_transcription(
+    config: EngineRuntimeConfig,
+    audio_bytes: AudioPayload,
+    overrides: Dict[str, Any],
+    filename: str,
+    content_type: str,
+) -> dict:
+    params = _merge_params(config, overrides)
+    api_base = params.get("api_base") or config.base_url
+    token = params.get("token") or resolve_api_key(config.api_key_env)
+
+    if not api_base or not token:
+        raise ASRConfigError("Coze ASR missing API base or token")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    headers.update(config.headers)
+
+    transcription_path = config.paths.get("transcription") if config.paths else None
+    path = normalize_path(transcription_path or "/v1/audio/transcriptions")
+    url = api_base.rstrip("/") + path
+
+    response = await _post_audio(url, headers, {}, filename, audio_bytes, content_type, config.timeout)
+    response.raise_for_status()
+    payload = response.json()
+    text = extract_text(payload)
+    return {"text": text} if text else payload
+
+
+async def _post_audio(
+    url: str,
+    headers: Dict[str, str],
+    data: Dict[str, Any],
+    filename: str,
+    audio: AudioPayload,
+    content_type: str,
+    timeout: float,
+) -> httpx.Response:
+    client = get_http_client(url)
+    if not isinstance(audio, AudioStream):
+        files = {"file": (filename, audio, content_type)}
+        return await client.post(url, headers=headers, data=data, files=files, timeout=timeout)
+
+    # httpx only builds multipart bodies from bytes or sync files, so the envelope is written by hand
+    # and the audio chunks are forwarded as they arrive.
+    boundary = os.urandom(16).hex()
+    head, tail = _multipart_envelope(boundary, data, filename, content_type)
+    headers = {**headers, "Content-Type": f"multipart/form-data; boundary={boundary}"}
+    if audio.size is not None:
+        headers["Content-Length"] = str(len(head) + audio.size + len(tail))
+    return await client.post(url, headers=headers, content=_chain(head, audio.chunks, tail), timeout=timeout)
+
+
+def _multipart_envelope(
+    boundary: str,
+    data: Dict[str, Any],
+    filename: str,
+    content_type: str,
+) -> Tuple[bytes, bytes]:
+    parts = []
+    for name, value in data.items():
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            parts.append(
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'
+                f"{_form_value(item)}\r\n"
+            )
+    parts.append(
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{_quote(filename)}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    )
+    return "".join(parts).encode("utf-8"), f"\r\n--{boundary}--\r\n".encode("ascii")
+
+
+def _quote(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+
+def _form_value(value: Any) -> str:
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return ""
+    return str(value)
+
+
+async def _chain(head: bytes, chunks: AsyncIterator[bytes], tail: bytes) -> AsyncIterator[bytes]:
+    yield head
+    async for chunk in chunks:
+        if chunk:
+            yield chunk
+    yield tail
+
+
+class RealtimeASRClient:
+    def __init__(
+        self,
+        config: EngineRuntimeConfig,
+        overrides: Dict[str, Any],
+        *,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        first_seq: int = 0,
+        on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.config = config
+        self.overrides = overrides
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.on_message = on_message
+        self._seq = first_seq
+        self._segments: List[Dict[str, Any]] = []
+        self._socket = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._done = asyncio.Event()
+        self._error: Optional[str] = None
+
+    @property
+    def next_seq(self) -> int:
+        return self._seq
+
+    async def send_audio(self, pcm: bytes) -> None:
+        socket = await self._connect()
+        try:
+            await socket.send(pcm)
+        except websockets.exceptions.ConnectionClosed as exc:
+            raise self._closed_error(exc) from exc
+
+    async def finish(self) -> dict:
+        socket = await self._connect()
+        try:
+            await socket.send(json.dumps({"type": "stop"}))
+        except websockets.exceptions.ConnectionClosed as exc:
+            raise self._closed_error(exc) from exc
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=self.config.timeout)
+        except asyncio.TimeoutError as exc:
+            raise ASRConfigError("Realtime ASR upstream timed out", status_code=504) from exc
+        if self._error:
+            raise ASRConfigError(f"Realtime ASR upstream failed: {self._error}", status_code=502)
+        text = join_transcripts(segment["text"] for segment in self._segments)
+        return {"text": text, "segments": list(self._segments)}
+
+    async def close(self) -> None:
+        reader, self._reader = self._reader, None
+        if reader is not None:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+        socket, self._socket = self._socket, None
+        if socket is not None:
+            await socket.close()
+
+    async def _connect(self):
+        async with self._lock:
+            if self._socket is not None:
+                return self._socket
+            if websocket_connect is None:
+                raise ASRConfigError("Realtime ASR requires the websockets package", status_code=500)
+            params = _merge_params(self.config, self.overrides)
+            headers = dict(self.config.headers)
+            api_key = params.pop("api_key", None) or resolve_api_key(self.config.api_key_env)
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
+            start: Dict[str, Any] = {"type": "start", "sample_rate": self.sample_rate, "channels": self.channels}
+            if self.config.model:
+                start["model"] = self.config.model
+            start.update(params)
+
+            realtime_path = self.config.paths.get("realtime") if self.config.paths else None
+            url = websocket_url(self.config.base_url.rstrip("/") + normalize_path(realtime_path or "/realtime"))
+            try:
+                socket = await websocket_connect(
+                    url, additional_headers=headers, open_timeout=self.config.timeout, max_size=None
+                )
+                await socket.send(json.dumps(start))
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as exc:
+                raise ASRConfigError(f"Realtime ASR upstream unavailable: {exc}", status_code=502) from exc
+            self._socket = socket
+            self._reader = asyncio.create_task(self._read(socket))
+            return socket
+
+    async def _read(self, socket) -> None:
+        try:
+            async for message in socket:
+                if isinstance(message, bytes):
+                    continue
+                try:
+                    payload = json.loads(message)
+                except ValueError:
+                    logger.debug("Ignoring non-JSON realtime ASR message")
+                    continue
+                kind = payload.get("type")
+                if kind == "partial":
+                    self._emit({"type": "partial", "seq": self._seq, "text": extract_text(payload).strip()})
+                elif kind == "final":
+                    segment = {"seq": self._seq, "text": extract_text(payload).strip()}
+                    self._segments.append(segment)
+                    self._seq += 1
+                    self._emit({"type": "final", **segment})
+                elif kind == "error":
+                    self._error = str(payload.get("error") or payload.get("message") or "unknown error")
+                    break
+                elif kind == "done":
+                    break
+        except websockets.exceptions.ConnectionClosedError as exc:
+            self._error = f"connection closed ({exc})"
+        finally:
+            self._done.set()
+
+    def _emit(self, payload: Dict[str, Any]) -> None:
+        if self.on_message is not None:
+            self.on_message(payload)
+
+    def _closed_error(self, exc: Exception) -> ASRConfigError:
+        return ASRConfigError(f"Realtime ASR upstream failed: {self._error or exc}", status_code=502)
+
+
+async def forward_realtime_transcription(
+    config: EngineRuntimeConfig,
+    audio_bytes: AudioPayload,
+    overrides: Dict[str, Any],
+) -> dict:
+    source = await _seekable(audio_bytes)
+    try:
+        try:
+            reader = wave.open(source, "rb")
+        except (wave.Error, EOFError) as exc:
+            raise ASRConfigError("Realtime ASR engines need PCM16 WAV audio", status_code=415) from exc
+        with reader:
+            if reader.getsampwidth() != 2:
+                raise ASRConfigError("Realtime ASR engines need PCM16 WAV audio", status_code=415)
+            client = RealtimeASRClient(
+                config, overrides, sample_rate=reader.getframerate(), channels=reader.getnchannels()
+            )
+            try:
+                frames_per_chunk = max(1, reader.getframerate() // 10)
+                while True:
+                    pcm = reader.readframes(frames_per_chunk)
+                    if not pcm:
+                        break
+                    await client.send_audio(pcm)
+                return await client.finish()
+            finally:
+                await client.close()
+    finally:
+        if source is not audio_bytes:
+            source.close()
+
+
+async def _seekable(audio: AudioPayload) -> BinaryIO:
+    if isinstance(audio, (bytes, bytearray)):
+        return io.BytesIO(audio)
+    if not isinstance(audio, AudioStream):
+        return audio
+    spool = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    async for chunk in audio.chunks:
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def join_transcripts(texts: Iterable[str]) -> str:
+    joined = ""
+    for text in texts:
+        if not text:
+            continue
+        if joined and (joined[-1].isascii() or text[0].isascii()):
+            joined += " "
+        joined += text
+    return joined
+
+
+def extract_text(payload: Dict[str, Any]) -> str:
+    if isinstance(payload.get("text"), str):
+        return payload["text"]
+    data = payload.get("data")
+    if isinstance(data, dict) and isinstance(data.get("text"), str):
+        return data["text"]
+    return ""
@@ -1,9 +1,11 @@
+import hashlib
 import json
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional
-
-import httpx
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 
+from app.core.cache import TTLCache
+from app.core.http_clients import get_http_client
 from app.core.settings import AppSettings, get_settings
 from app.services.providers.types import ProviderConfig
 
@@ -18,6 +20,12 @@ class LLMResponse:
     conversation_id: Optional[str] = None
 
 
+@dataclass
+class LLMDelta:
+    text: str
+    conversation_id: Optional[str] = None
+
+
 class LLMProvider:
     def supports_messages(self) -> bool:
         return False
@@ -37,14 +45,14 @@ class LLMProvider:
         user_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
         messages: Optional[List[Dict[str, Any]]] = None,
-    ) -> List[str]:
+    ) -> AsyncIterator[LLMDelta]:
         response = await self.generate(
             text=text,
             user_id=user_id,
             conversation_id=conversation_id,
             messages=messages,
         )
-        return [response.text]
+        yield LLMDelta(text=response.text, conversation_id=response.conversation_id)
 
 
 class OpenAICompatProvider(LLMProvider):
@@ -81,10 +89,10 @@ class OpenAICompatProvider(LLMProvider):
             "temperature": self.temperature,
             "stream": False,
         }
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(f"{self.base_url}/chat/completions", headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client(self.base_url)
+        response = await client.post(f"{self.base_url}/chat/completions", headers=headers, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
 
         try:
             content = data["choices"][0]["message"]["content"]
@@ -101,7 +109,7 @@ class OpenAICompatProvider(LLMProvider):
         user_id: Optional[str] = None,
         conversation_id: Optional[str] = None,
         messages: Optional[List[Dict[str, Any]]] = None,
-    ) -> List[str]:
+    ) -> AsyncIterator[LLMDelta]:
         headers = {"Content-Type": "application/json"}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
@@ -113,43 +121,43 @@ class OpenAICompatProvider(LLMProvider):
             "stream": True,
         }
 
-        deltas: List[str] = []
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=payload,
-            ) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    chunk = line.strip()
-                    if not chunk:
-                        continue
-                    if not chunk.startswith("data:"):
-                        continue
-                    data = chunk.split("data:", 1)[1].strip()
-                    if data == "[DONE]":
-                        break
-                    try:
-                        payload = json.loads(data)
-                    except json.JSONDecodeError:
-                        continue
-                    choices = payload.get("choices") or []
-                    if not choices:
-                        continue
-                    delta = choices[0].get("delta") or {}
-                    content = delta.get("content")
-                    if content:
-                        deltas.append(content)
-
-        if not deltas:
+        received = False
+        client = get_http_client(self.base_url)
+        async with client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                chunk = line.strip()
+                if not chunk:
+                    continue
+                if not chunk.startswith("data:"):
+                    continue
+                data = chunk.split("data:", 1)[1].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    payload = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                choices = payload.get("choices") or []
+                if not choices:
+                    continue
+                delta = choices[0].get("delta") or {}
+                content = delta.get("content")
+                if content:
+                    received = True
+                    yield LLMDelta(text=content)
+
+        if not received:
             response = await self.generate(
                 text=text, user_id=user_id, conversation_id=conversation_id, messages=messages
             )
-            return [response.text]
-
-        return deltas
+            yield LLMDelta(text=response.text)
 
     def _resolve_messages(
         self, text: str, messages: Optional[List[Dict[str, Any]]]
@@ -190,10 +198,10 @@ class DifyProvider(LLMProvider):
             "conversation_id": conversation_id or "",
             "files": [],
         }
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(f"{self.base_url}/chat-messages", headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client(self.base_url)
+        response = await client.post(f"{self.base_url}/chat-messages", headers=headers, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
 
         answer = data.get("answer")
         if not answer:
@@ -229,10 +237,10 @@ class FastGPTProvider(LLMProvider):
             ],
             "customUid": user_id or self.uid,
         }
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(f"{self.base_url}/v1/chat/completions", headers=headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client(self.base_url)
+        response = await client.post(f"{self.base_url}/v1/chat/completions", headers=headers, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
 
         try:
             message = data["choices"][0].get("message") or {}
@@ -258,10 +266,10 @@ class CozeProvider(LLMProvider):
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
         }
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(f"{self.api_base}/v1/conversation/create", headers=headers)
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client(self.api_base)
+        response = await client.post(f"{self.api_base}/v1/conversation/create", headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
 
         try:
             return data["data"]["id"]
@@ -275,6 +283,22 @@ class CozeProvider(LLMProvider):
         conversation_id: Optional[str] = None,
         messages: Optional[List[Dict[str, Any]]] = None,
     ) -> LLMResponse:
+        return await collect_stream(
+            self.stream(
+                text=text,
+                user_id=user_id,
+                conversation_id=conversation_id,
+                messages=messages,
+            )
+        )
+
+    async def stream(
+        self,
+        text: str,
+        user_id: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+        messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncIterator[LLMDelta]:
         text = _coerce_text_from_messages(text, messages)
         if not conversation_id:
             conversation_id = await self._create_conversation()
@@ -293,36 +317,47 @@ class CozeProvider(LLMProvider):
         }
         api_url = f"{self.api_base}/v3/chat?conversation_id={conversation_id}"
 
-        text_chunks = []
+        received = False
         event_name = None
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            async with client.stream("POST", api_url, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    chunk = line.strip()
-                    if not chunk:
-                        continue
-                    if chunk.startswith("event:"):
-                        event_name = chunk.split(":", 1)[1].strip()
-                        continue
-                    if event_name != "conversation.message.delta":
-                        continue
-                    if "data:" not in chunk:
-                        continue
-                    message_data = chunk.split("data:", 1)[1].strip()
-                    if not message_data:
-                        continue
-                    try:
-                        message_json = json.loads(message_data)
-                    except json.JSONDecodeError:
-                        continue
-                    content = message_json.get("content")
-                    if content:
-                        text_chunks.append(content)
-
-        if not text_chunks:
+        client = get_http_client(api_url)
+        async with client.stream("POST", api_url, headers=headers, json=payload, timeout=self.timeout) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                chunk = line.strip()
+                if not chunk:
+                    continue
+                if chunk.startswith("event:"):
+                    event_name = chunk.split(":", 1)[1].strip()
+                    continue
+                if event_name != "conversation.message.delta":
+                    continue
+                if "data:" not in chunk:
+                    continue
+                message_data = chunk.split("data:", 1)[1].strip()
+                if not message_data:
+                    continue
+                try:
+                    message_json = json.loads(message_data)
+                except json.JSONDecodeError:
+                    continue
+                content = message_json.get("content")
+                if content:
+                    received = True
+                    yield LLMDelta(text=content, conversation_id=conversation_id)
+
+        if not received:
             raise LLMConfigError("Coze response missing content")
-        return LLMResponse(text="".join(text_chunks), conversation_id=conversation_id)
+
+
+async def collect_stream(deltas: AsyncIterator[LLMDelta]) -> LLMResponse:
+    chunks: List[str] = []
+    conversation_id: Optional[str] = None
+    async for delta in deltas:
+        if delta.text:
+            chunks.append(delta.text)
+        if delta.conversation_id:
+            conversation_id = delta.conversation_id
+    return LLMResponse(text="".join(chunks), conversation_id=conversation_id)
 
 
 def _extract_conversation_id(data: Dict[str, Any]) -> Optional[str]:
@@ -412,8 +447,46 @@ def get_llm_provider() -> LLMProvider:
     return build_llm_provider(settings)
 
 
+@lru_cache
+def get_llm_provider_cache() -> TTLCache[str, LLMProvider]:
+    settings = get_settings()
+    return TTLCache(
+        max_size=settings.llm_provider_cache_size,
+        ttl=settings.llm_provider_cache_ttl,
+    )
+
+
 def build_llm_provider_from_config(
     config: ProviderConfig, settings: Optional[AppSettings] = None
+) -> LLMProvider:
+    cache = get_llm_provider_cache()
+    key = _provider_cache_key(config)
+    provider = cache.get(key)
+    if provider is None:
+        provider = _create_llm_provider_from_config(config, settings)
+        cache.set(key, provider)
+    return provider
+
+
+def _provider_cache_key(config: ProviderConfig) -> str:
+    api_key = config.api_key or ""
+    fingerprint = hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else ""
+    raw = json.dumps(
+        [
+            config.provider_id.lower(),
+            config.base_url or "",
+            fingerprint,
+            config.model or "",
+            config.extra if isinstance(config.extra, dict) else {},
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _create_llm_provider_from_config(
+    config: ProviderConfig, settings: Optional[AppSettings] = None
 ) -> LLMProvider:
     settings = settings or get_settings()
     provider_id = config.provider_id.lower()
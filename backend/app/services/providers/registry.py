@@ -1,7 +1,6 @@
 from typing import List, Optional
 
-import httpx
-
+from app.core.http_clients import get_http_client
 from app.services.providers.types import ProviderConfig, ProviderValidation
 
 
@@ -91,10 +90,10 @@ class ProviderRegistry:
             headers["Authorization"] = f"Bearer {config.api_key}"
         url = config.base_url.rstrip("/") + "/models"
 
-        async with httpx.AsyncClient(timeout=15) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client(url)
+        response = await client.get(url, headers=headers, timeout=15)
+        response.raise_for_status()
+        data = response.json()
 
         models = data.get("data") if isinstance(data, dict) else None
         if not isinstance(models, list):
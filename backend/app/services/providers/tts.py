@@ -1,3 +1,382 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.cache import SingleFlight
+from app.core.http_clients import get_http_client
+from app.core.http_utils import normalize_path, resolve_api_key, sanitize_config
+from app.core.settings import get_settings
+from app.services.engines import EngineRuntimeConfig, registry, runtime_store
+from app.services.speech_synthesis import (
+    CONCATENABLE_MEDIA_TYPES,
+    SynthesisError,
+    concat_audio,
+    synthesize_in_order,
+)
+from app.services.text_segmenter import split_text
+
+logger = logging.getLogger(__name__)
+
+
+class TTSConfigError(ValueError):
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
 class TTSProvider:
     def synthesize(self, text: str) -> bytes:
         raise NotImplementedError
+
+
+class CozeVoiceCache:
+    def __init__(self, ttl: float, max_stale: float, max_size: int = 256) -> None:
+        self.ttl = max(0.0, ttl)
+        self.max_stale = max(self.ttl, max_stale)
+        self.max_size = max(1, max_size)
+        self._items: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._flights: SingleFlight[str, Optional[str]] = SingleFlight()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        if self.ttl <= 0:
+            return await fetch()
+        entry = self._items.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.max_stale:
+                self.hits += 1
+                self._items.move_to_end(key)
+                if age >= self.ttl:
+                    self._refresh(key, fetch)
+                return entry[1]
+            self._items.pop(key, None)
+        self.misses += 1
+        return await self._flights.do(key, lambda: self._load(key, fetch))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+        }
+
+    async def _load(self, key: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        voice_id = await fetch()
+        if voice_id:
+            self._items[key] = (time.monotonic(), voice_id)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return voice_id
+
+    def _refresh(self, key: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> None:
+        if key in self._refreshing:
+            return
+        self.refreshes += 1
+        task = asyncio.create_task(self._refresh_quietly(key, fetch))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh_quietly(self, key: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> None:
+        try:
+            await self._flights.do(key, lambda: self._load(key, fetch))
+        except Exception as exc:
+            # Keep serving the stale voice id until max_stale runs out.
+            logger.warning("Coze voice refresh failed: %s", exc)
+
+
+def resolve_engine_id(engine_id: str) -> str:
+    if engine_id == "default":
+        default_spec = registry.get_default("tts")
+        return default_spec.id if default_spec else ""
+    return engine_id
+
+
+def get_engine_config(engine_id: str) -> EngineRuntimeConfig:
+    if not engine_id:
+        raise TTSConfigError("Missing engine id")
+    config = runtime_store.get("tts", engine_id)
+    if not config or not config.base_url:
+        raise TTSConfigError("TTS engine not configured", status_code=404)
+    engine_type = (config.engine_type or "openai_compat").lower()
+    if engine_type not in {"dify_tts", "coze_tts", "dify", "coze"} and not config.model:
+        raise TTSConfigError("TTS engine missing model")
+    return config
+
+
+async def synthesize_stream(
+    config: EngineRuntimeConfig,
+    text: str,
+    overrides: Dict[str, Any],
+) -> Tuple[AsyncIterator[bytes], str]:
+    engine_type = (config.engine_type or "openai_compat").lower()
+    if engine_type in {"dify_tts", "dify"}:
+        stream = await stream_dify_tts(config, text, overrides)
+    elif engine_type in {"coze_tts", "coze"}:
+        stream = await stream_coze_tts(config, text, overrides)
+    else:
+        url, headers, payload = build_openai_request(config, text, overrides)
+        stream = await create_tts_stream(url, headers, payload, timeout=config.timeout)
+    if stream is None:
+        raise TTSConfigError("TTS engine missing credentials")
+    return stream, resolve_media_type(config, overrides)
+
+
+async def synthesize_chunked(
+    config: EngineRuntimeConfig,
+    text: str,
+    overrides: Dict[str, Any],
+    *,
+    max_chars: int,
+    parallelism: int,
+) -> Tuple[AsyncIterator[bytes], str]:
+    media_type = resolve_media_type(config, overrides)
+    segments = split_text(text, max_chars) if max_chars > 0 else []
+    if len(segments) <= 1 or media_type not in CONCATENABLE_MEDIA_TYPES:
+        return await synthesize_stream(config, text, overrides)
+
+    async def source() -> AsyncIterator[str]:
+        for segment in segments:
+            yield segment
+
+    async def synthesize(segment: str) -> Tuple[AsyncIterator[bytes], str]:
+        return await synthesize_stream(config, segment, overrides)
+
+    chunks = synthesize_in_order(source(), synthesize, concurrency=parallelism)
+    stream = concat_audio(chunks, media_type)
+    # Wait for the first audio so a failing first segment still surfaces as an HTTP error.
+    try:
+        first = await anext(stream, b"")
+    except SynthesisError as exc:
+        await stream.aclose()
+        raise TTSConfigError(str(exc), status_code=502) from exc
+
+    async def resumed() -> AsyncIterator[bytes]:
+        async with aclosing(stream):
+            if first:
+                yield first
+            async for chunk in stream:
+                yield chunk
+
+    return resumed(), media_type
+
+
+def resolve_media_type(config: EngineRuntimeConfig, overrides: Dict[str, Any]) -> str:
+    engine_type = (config.engine_type or "openai_compat").lower()
+    if engine_type in {"dify_tts", "dify"}:
+        return "audio/mpeg"
+    params = _merge_params(config, overrides)
+    if engine_type in {"coze_tts", "coze"}:
+        return audio_media_type(params.get("response_format") or "mp3")
+    return audio_media_type(params.get("response_format") or params.get("format"))
+
+
+def build_openai_request(
+    config: EngineRuntimeConfig,
+    text: str,
+    overrides: Dict[str, Any],
+) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    base_url_override, api_key_override = resolve_connection_overrides(overrides)
+    payload: Dict[str, Any] = {"model": config.model, "input": text}
+    payload.update(config.default_params)
+    payload.update(sanitize_config(overrides))
+
+    if "voice" not in payload:
+        raise TTSConfigError("Missing voice for TTS")
+
+    speech_path = config.paths.get("speech") if config.paths else None
+    path = normalize_path(speech_path or "/audio/speech")
+    url = (base_url_override or config.base_url).rstrip("/") + path
+
+    headers = {"Content-Type": "application/json"}
+    headers.update(config.headers)
+    api_key = api_key_override or resolve_api_key(config.api_key_env)
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return url, headers, payload
+
+
+def resolve_connection_overrides(config: Dict[str, Any]) -> tuple[Optional[str], Optional[str]]:
+    base_url = config.get("base_url") or config.get("baseUrl")
+    api_key = config.get("api_key") or config.get("apiKey")
+    return (
+        str(base_url).strip() if isinstance(base_url, str) and base_url.strip() else None,
+        str(api_key).strip() if isinstance(api_key, str) and api_key.strip() else None,
+    )
+
+
+def audio_media_type(format_name: Optional[str]) -> str:
+    if not format_name:
+        return "audio/mpeg"
+    value = str(format_name).lower()
+    if value == "wav":
+        return "audio/wav"
+    if value == "pcm":
+        return "audio/pcm"
+    if value in {"opus", "ogg_opus"}:
+        return "audio/opus"
+    if value == "aac":
+        return "audio/aac"
+    if value == "flac":
+        return "audio/flac"
+    return "audio/mpeg"
+
+
+async def create_tts_stream(
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+    *,
+    timeout: float,
+) -> AsyncIterator[bytes]:
+    client = get_http_client(url)
+    request = client.build_request("POST", url, headers=headers, json=payload, timeout=timeout)
+    try:
+        response = await client.send(request, stream=True)
+    except httpx.HTTPError as exc:
+        raise TTSConfigError(str(exc), status_code=502) from exc
+
+    if response.status_code >= 400:
+        detail = await response.aread()
+        await response.aclose()
+        raise TTSConfigError(
+            detail.decode("utf-8", errors="ignore") or response.reason_phrase,
+            status_code=response.status_code,
+        )
+
+    async def iterator() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in response.aiter_bytes():
+                yield chunk
+        finally:
+            await response.aclose()
+
+    return iterator()
+
+
+def _merge_params(config: EngineRuntimeConfig, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(config.default_params or {})
+    merged.update(sanitize_config(overrides))
+    return merged
+
+
+async def stream_dify_tts(
+    config: EngineRuntimeConfig,
+    text: str,
+    overrides: Dict[str, Any],
+) -> Optional[AsyncIterator[bytes]]:
+    params = _merge_params(config, overrides)
+    api_server = params.get("api_server") or config.base_url
+    api_key = params.get("api_key") or resolve_api_key(config.api_key_env)
+    username = params.get("username") or params.get("user")
+
+    if not api_server:
+        return None
+    if not api_key:
+        return None
+    if not username:
+        return None
+
+    payload = {"text": text, "user": username}
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    headers.update(config.headers)
+
+    speech_path = config.paths.get("speech") if config.paths else None
+    path = normalize_path(speech_path or "/text-to-audio")
+    url = api_server.rstrip("/") + path
+
+    return await create_tts_stream(url, headers, payload, timeout=config.timeout)
+
+
+async def stream_coze_tts(
+    config: EngineRuntimeConfig,
+    text: str,
+    overrides: Dict[str, Any],
+) -> Optional[AsyncIterator[bytes]]:
+    params = _merge_params(config, overrides)
+    api_base = params.get("api_base") or config.base_url
+    token = params.get("token") or resolve_api_key(config.api_key_env)
+    bot_id = params.get("bot_id")
+    response_format = params.get("response_format") or "mp3"
+    sample_rate = params.get("sample_rate") or 16000
+
+    if not api_base or not token or not bot_id:
+        return None
+
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    headers.update(config.headers)
+
+    bot_path = config.paths.get("bot") if config.paths else None
+    voice_id = params.get("voice_id") or await get_coze_voice_cache().get(
+        _coze_voice_key(api_base, token, bot_id, bot_path),
+        lambda: fetch_coze_voice_id(api_base, headers, bot_id, bot_path, timeout=config.timeout),
+    )
+    if not voice_id:
+        return None
+
+    payload = {
+        "input": text,
+        "voice_id": voice_id,
+        "speed": params.get("speed") or 1.0,
+        "response_format": response_format,
+        "sample_rate": sample_rate,
+    }
+
+    speech_path = config.paths.get("speech") if config.paths else None
+    path = normalize_path(speech_path or "/v1/audio/speech")
+    url = api_base.rstrip("/") + path
+
+    return await create_tts_stream(url, headers, payload, timeout=config.timeout)
+
+
+@lru_cache
+def get_coze_voice_cache() -> CozeVoiceCache:
+    settings = get_settings()
+    return CozeVoiceCache(
+        ttl=settings.coze_voice_cache_ttl,
+        max_stale=settings.coze_voice_cache_max_stale,
+    )
+
+
+def _coze_voice_key(api_base: str, token: str, bot_id: str, path: Optional[str]) -> str:
+    fingerprint = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    return "|".join([api_base.rstrip("/"), path or "", bot_id, fingerprint])
+
+
+async def fetch_coze_voice_id(
+    api_base: str,
+    headers: Dict[str, str],
+    bot_id: str,
+    path_template: Optional[str],
+    *,
+    timeout: float,
+) -> Optional[str]:
+    path = path_template or "/v1/bots/{bot_id}"
+    if "{bot_id}" in path:
+        path = path.replace("{bot_id}", bot_id)
+    path = normalize_path(path)
+    url = api_base.rstrip("/") + path
+    client = get_http_client(url)
+    response = await client.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    voice_info = (data.get("data") or {}).get("voice_info_list") or []
+    if not voice_info:
+        return None
+    voice_id = voice_info[0].get("voice_id")
+    if isinstance(voice_id, str) and voice_id:
+        return voice_id
+    return None
+
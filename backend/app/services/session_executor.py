@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class SessionExecutor:
+    def __init__(self, max_pending: int = 32) -> None:
+        self.max_pending = max(1, max_pending)
+        self.rejected = 0
+        self.completed = 0
+        self.peak_depth = 0
+        self._queues: Dict[str, Deque[Job]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def submit(self, key: str, job: Job) -> bool:
+        queue = self._queues.setdefault(key, deque())
+        if len(queue) >= self.max_pending:
+            self.rejected += 1
+            return False
+        queue.append(job)
+        self.peak_depth = max(self.peak_depth, len(queue))
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._work(key))
+        return True
+
+    def cancel(self, key: str) -> None:
+        # Forget the worker now, so a submit before it has unwound starts a fresh one.
+        self._queues.pop(key, None)
+        self._running.pop(key, None)
+        worker = self._workers.pop(key, None)
+        if worker is not None:
+            worker.cancel()
+
+    def depth(self, key: str) -> int:
+        return len(self._queues.get(key, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [len(queue) for queue in self._queues.values() if queue]
+        return {
+            "sessions": len(self._workers),
+            "running": len(self._running),
+            "pending": sum(depths),
+            "max_depth": max(depths, default=0),
+            "max_pending": self.max_pending,
+            "peak_depth": self.peak_depth,
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
+
+    async def _work(self, key: str) -> None:
+        worker = asyncio.current_task()
+        current: Optional[asyncio.Task] = None
+        try:
+            while True:
+                queue = self._queues.get(key)
+                if not queue:
+                    return
+                job = queue.popleft()
+                current = asyncio.create_task(self._run(job))
+                self._running[key] = current
+                await asyncio.wait([current])
+                self._running.pop(key, None)
+                current = None
+        except asyncio.CancelledError:
+            if current is not None:
+                current.cancel()
+            raise
+        finally:
+            if self._workers.get(key) is worker:
+                self._running.pop(key, None)
+                self._workers.pop(key, None)
+                if not self._queues.get(key):
+                    self._queues.pop(key, None)
+
+    async def _run(self, job: Job) -> None:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            logger.exception("Session job failed")
+        finally:
+            self.completed += 1
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+SendJson = Callable[[Dict[str, Any]], Awaitable[None]]
+SendBytes = Callable[[bytes], Awaitable[None]]
+OnOverflow = Callable[[], Awaitable[None]]
+Frame = Union[bytes, Dict[str, Any]]
+
+_OVERFLOW = object()
+
+
+class SocketWriter:
+    def __init__(
+        self,
+        send_json: SendJson,
+        send_bytes: Optional[SendBytes] = None,
+        *,
+        max_size: int = 0,
+        on_overflow: Optional[OnOverflow] = None,
+    ) -> None:
+        self._send_json = send_json
+        self._send_bytes = send_bytes
+        self.max_size = max(0, max_size)
+        self._on_overflow = on_overflow
+        self.closed = False
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._audio = 0
+        self._room = asyncio.Event()
+        self._room.set()
+        self._task: Optional[asyncio.Task] = None
+
+    def send_json(self, payload: Dict[str, Any]) -> None:
+        if self.max_size and self._outbox.qsize() - self._audio >= self.max_size:
+            # Control frames never block their producer; a peer too slow to drain them is cut off.
+            self._overflow()
+            return
+        self._put(payload)
+
+    async def send_bytes(self, data: bytes) -> None:
+        # Audio waits for room instead, which pushes backpressure up into synthesis.
+        while self.max_size and self._audio >= self.max_size and not self.closed:
+            self._room.clear()
+            await self._room.wait()
+        if self.closed:
+            return
+        self._audio += 1
+        self._put(data)
+
+    def discard(self) -> None:
+        while not self._outbox.empty():
+            self._outbox.get_nowait()
+        self._audio = 0
+        self._room.set()
+
+    async def close(self) -> None:
+        self._stop()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def _put(self, frame: Frame) -> None:
+        if self.closed:
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._outbox.put_nowait(frame)
+
+    def _overflow(self) -> None:
+        if self.closed:
+            return
+        logger.warning("Socket writer outbox full (%d frames), disconnecting", self.max_size)
+        self.discard()
+        self._put(_OVERFLOW)
+        self._stop()
+
+    def _stop(self) -> None:
+        self.closed = True
+        self._room.set()
+
+    async def _run(self) -> None:
+        # Sends only happen here, so cancelling a producer never interrupts a socket write.
+        try:
+            while True:
+                frame = await self._outbox.get()
+                if frame is _OVERFLOW:
+                    if self._on_overflow is not None:
+                        await self._on_overflow()
+                    return
+                if isinstance(frame, bytes):
+                    self._audio -= 1
+                    self._room.set()
+                    if self._send_bytes is not None:
+                        await self._send_bytes(frame)
+                else:
+                    await self._send_json(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug("Socket writer stopped: %s", exc)
+        finally:
+            self._stop()
@@ -0,0 +1,152 @@
+import asyncio
+import struct
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Optional, Set, Tuple
+
+Synthesizer = Callable[[str], Awaitable[Tuple[AsyncIterator[bytes], str]]]
+
+# Formats whose segments can be joined back-to-back into one playable stream.
+CONCATENABLE_MEDIA_TYPES = frozenset({"audio/mpeg", "audio/aac", "audio/pcm", "audio/wav"})
+_WAV_STREAMING_SIZE = 0xFFFFFFFF
+
+
+class SynthesisError(RuntimeError):
+    pass
+
+
+@dataclass
+class AudioChunk:
+    segment: int
+    data: bytes
+    media_type: str
+    error: Optional[str] = None
+    end: bool = False
+
+
+async def synthesize_in_order(
+    segments: AsyncIterator[str],
+    synthesize: Synthesizer,
+    *,
+    concurrency: int = 2,
+    mark_end: bool = False,
+) -> AsyncIterator[AudioChunk]:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    order: asyncio.Queue = asyncio.Queue()
+    workers: Set[asyncio.Task] = set()
+
+    async def run(index: int, text: str, chunks: asyncio.Queue) -> None:
+        try:
+            stream, media_type = await synthesize(text)
+            async with aclosing(stream):
+                async for data in stream:
+                    if data:
+                        chunks.put_nowait(AudioChunk(index, data, media_type))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            chunks.put_nowait(AudioChunk(index, b"", "", error=str(exc)))
+        finally:
+            chunks.put_nowait(None)
+
+    async def feed() -> None:
+        index = 0
+        try:
+            async for text in segments:
+                # A permit is held until the consumer has drained the segment, so at most
+                # `concurrency` segments are ever synthesized ahead or buffered.
+                await semaphore.acquire()
+                chunks: asyncio.Queue = asyncio.Queue()
+                worker = asyncio.create_task(run(index, text, chunks))
+                workers.add(worker)
+                worker.add_done_callback(workers.discard)
+                order.put_nowait(chunks)
+                index += 1
+        finally:
+            order.put_nowait(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        index = 0
+        while True:
+            chunks = await order.get()
+            if chunks is None:
+                break
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            semaphore.release()
+            if mark_end:
+                yield AudioChunk(index, b"", "", end=True)
+            index += 1
+        await feeder
+    finally:
+        pending = [feeder, *workers]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def concat_audio(chunks: AsyncIterator[AudioChunk], media_type: str) -> AsyncIterator[bytes]:
+    wav = media_type == "audio/wav"
+    segment = -1
+    header = bytearray()
+    remaining: Optional[int] = None
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            if chunk.error:
+                raise SynthesisError(chunk.error)
+            if not wav:
+                yield chunk.data
+                continue
+            if chunk.segment != segment:
+                if remaining is None and header:
+                    yield bytes(header)
+                segment = chunk.segment
+                header = bytearray()
+                remaining = None
+            data = chunk.data
+            if remaining is None:
+                header.extend(data)
+                parsed = _parse_wav_header(bytes(header))
+                if parsed is None:
+                    continue
+                offset, remaining = parsed
+                data = bytes(header[offset:])
+                if segment == 0 and offset:
+                    yield _streaming_wav_header(bytes(header[:offset]))
+            if remaining >= 0:
+                data = data[:remaining]
+                remaining -= len(data)
+            if data:
+                yield data
+    if wav and remaining is None and header:
+        yield bytes(header)
+
+
+def _parse_wav_header(data: bytes) -> Optional[Tuple[int, int]]:
+    if len(data) < 12:
+        return None
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        # Not a RIFF container: pass the bytes through untouched.
+        return 0, -1
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        (size,) = struct.unpack_from("<I", data, offset + 4)
+        if chunk_id == b"data":
+            streaming = size in {0, _WAV_STREAMING_SIZE}
+            return offset + 8, -1 if streaming else size
+        offset += 8 + size + (size & 1)
+    return None
+
+
+def _streaming_wav_header(header: bytes) -> bytes:
+    if header[:4] != b"RIFF":
+        return header
+    patched = bytearray(header)
+    struct.pack_into("<I", patched, 4, _WAV_STREAMING_SIZE)
+    struct.pack_into("<I", patched, len(patched) - 4, _WAV_STREAMING_SIZE)
+    return bytes(patched)
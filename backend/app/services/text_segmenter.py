@@ -0,0 +1,89 @@
+from typing import List, Optional
+
+SENTENCE_ENDINGS = frozenset(".!?;…。！？；\n")
+CLAUSE_ENDINGS = frozenset(",:，、：")
+CLOSING_MARKS = frozenset("\"')]}”’）】」』》")
+
+
+class SentenceSegmenter:
+    def __init__(self, min_chars: int = 2, max_chars: int = 160, clause_chars: int = 60) -> None:
+        self.min_chars = max(1, min_chars)
+        self.max_chars = max(self.min_chars, max_chars)
+        self.clause_chars = max(self.min_chars, clause_chars)
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        if not text:
+            return []
+        self._buffer += text
+        segments: List[str] = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            segment, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:]
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> Optional[str]:
+        segment, self._buffer = self._buffer.strip(), ""
+        return segment or None
+
+    def _find_cut(self) -> Optional[int]:
+        buffer = self._buffer
+        length = len(buffer)
+        clause_cut = None
+        for index, char in enumerate(buffer):
+            if char in SENTENCE_ENDINGS:
+                end = _skip_closing(buffer, index + 1)
+                if end >= length and buffer[end - 1] == "." and _may_continue(buffer, end - 1):
+                    # A trailing period may still be part of "3.14" or "...".
+                    return None
+                if char == "." and end < length and not buffer[end].isspace():
+                    continue
+                if len(buffer[:end].strip()) >= self.min_chars:
+                    return end
+            elif char in CLAUSE_ENDINGS and index + 1 >= self.clause_chars:
+                clause_cut = clause_cut or _skip_closing(buffer, index + 1)
+            if clause_cut is not None and clause_cut < length:
+                return clause_cut
+            if index + 1 >= self.max_chars:
+                return _last_space(buffer, index + 1) or index + 1
+        return None
+
+
+def split_text(text: str, max_chars: int, min_chars: int = 1) -> List[str]:
+    segmenter = SentenceSegmenter(min_chars=min_chars, max_chars=max_chars, clause_chars=max_chars)
+    sentences = segmenter.feed(text)
+    tail = segmenter.flush()
+    if tail:
+        sentences.append(tail)
+    segments: List[str] = []
+    for sentence in sentences:
+        if segments:
+            joined = _join(segments[-1], sentence)
+            if len(joined) <= segmenter.max_chars:
+                segments[-1] = joined
+                continue
+        segments.append(sentence)
+    return segments
+
+
+def _join(left: str, right: str) -> str:
+    return left + right if not left[-1].isascii() else f"{left} {right}"
+
+
+def _skip_closing(text: str, index: int) -> int:
+    while index < len(text) and (text[index] in CLOSING_MARKS or text[index] in SENTENCE_ENDINGS):
+        index += 1
+    return index
+
+
+def _may_continue(text: str, index: int) -> bool:
+    return index > 0 and (text[index - 1].isdigit() or text[index - 1] == ".")
+
+
+def _last_space(text: str, limit: int) -> Optional[int]:
+    index = text.rfind(" ", 0, limit)
+    return index + 1 if index > 0 else None
@@ -0,0 +1,328 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import OrderedDict
+from contextlib import aclosing, suppress
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, Optional, Tuple
+
+from app.core.cache import SingleFlight
+from app.core.http_utils import sanitize_config
+from app.core.settings import get_settings
+from app.services.engines import EngineRuntimeConfig
+from app.services.providers import tts
+
+logger = logging.getLogger(__name__)
+
+MEDIA_EXTENSIONS = {
+    "audio/mpeg": ".mp3",
+    "audio/wav": ".wav",
+    "audio/pcm": ".pcm",
+    "audio/opus": ".opus",
+    "audio/aac": ".aac",
+    "audio/flac": ".flac",
+}
+EXTENSION_MEDIA_TYPES = {extension: media_type for media_type, extension in MEDIA_EXTENSIONS.items()}
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class CachedAudio:
+    key: str
+    path: Path
+    media_type: str
+    size: int
+
+
+class TTSAudioCache:
+    def __init__(self, directory: str, max_bytes: int, max_text_chars: int = 200) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max(0, max_bytes)
+        self.max_text_chars = max(0, max_text_chars)
+        self._entries: "OrderedDict[str, CachedAudio]" = OrderedDict()
+        self._total_bytes = 0
+        self._flights: SingleFlight[str, CachedAudio] = SingleFlight()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_text_chars > 0
+
+    def key_for(
+        self,
+        engine_id: str,
+        config: EngineRuntimeConfig,
+        text: str,
+        overrides: Dict[str, Any],
+    ) -> Optional[str]:
+        normalized = normalize_text(text)
+        if not self.enabled or not normalized or len(normalized) > self.max_text_chars:
+            return None
+        params = dict(config.default_params or {})
+        params.update(sanitize_config(overrides))
+        base_url, api_key = tts.resolve_connection_overrides(overrides)
+        raw = json.dumps(
+            [
+                engine_id,
+                (config.engine_type or "openai_compat").lower(),
+                config.model or "",
+                base_url or config.base_url,
+                # Callers with their own key get their own entries; only a digest of the key is hashed in.
+                _fingerprint(api_key),
+                params.get("voice") or "",
+                normalized,
+                params,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        entry = self._lookup(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with suppress(OSError):
+            os.utime(entry.path)
+        return entry
+
+    async def fetch(
+        self,
+        key: str,
+        config: EngineRuntimeConfig,
+        text: str,
+        overrides: Dict[str, Any],
+    ) -> CachedAudio:
+        return await self._flights.do(key, lambda: self._fill(key, config, text, overrides))
+
+    async def read(self, entry: CachedAudio) -> Optional[AsyncIterator[bytes]]:
+        # The handle is opened before the response starts, so a later eviction cannot unlink the clip from under it.
+        try:
+            return await _open_file(entry.path)
+        except OSError:
+            self._discard(entry.key, unlink=False)
+            return None
+
+    def filling(self, key: str) -> bool:
+        return key in self._flights
+
+    async def stream(
+        self,
+        key: str,
+        config: EngineRuntimeConfig,
+        text: str,
+        overrides: Dict[str, Any],
+    ) -> Tuple[AsyncIterator[bytes], str]:
+        if self.filling(key):
+            entry = await self.fetch(key, config, text, overrides)
+            return await _open_file(entry.path), entry.media_type
+        # The first miss is streamed to its caller while the clip is written; the fill itself is
+        # detached, so the clip is still stored if that caller goes away.
+        listener: asyncio.Queue = asyncio.Queue()
+        fill = self._flights.start(key, lambda: self._fill(key, config, text, overrides, listener))
+        media_type = await listener.get()
+        if media_type is None:
+            entry = await asyncio.shield(fill)
+            return await _open_file(entry.path), entry.media_type
+        return self._tee(fill, listener), media_type
+
+    async def warm(
+        self,
+        engine_id: str,
+        config: EngineRuntimeConfig,
+        phrases: Iterable[str],
+        overrides: Dict[str, Any],
+        *,
+        concurrency: int = 4,
+    ) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        result: Dict[str, Any] = {"cached": 0, "stored": 0, "skipped": 0, "failed": []}
+
+        async def warm_one(phrase: str) -> None:
+            key = self.key_for(engine_id, config, phrase, overrides)
+            if key is None:
+                result["skipped"] += 1
+                return
+            if self._lookup(key) is not None:
+                result["cached"] += 1
+                return
+            async with semaphore:
+                try:
+                    await self.fetch(key, config, phrase, overrides)
+                except Exception as exc:
+                    result["failed"].append({"text": phrase, "error": str(exc)})
+                    return
+            result["stored"] += 1
+
+        await asyncio.gather(*(warm_one(phrase) for phrase in phrases))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        self._load()
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "inflight": len(self._flights),
+        }
+
+    def _lookup(self, key: str) -> Optional[CachedAudio]:
+        self._load()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.path.is_file():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def _fill(
+        self,
+        key: str,
+        config: EngineRuntimeConfig,
+        text: str,
+        overrides: Dict[str, Any],
+        listener: Optional[asyncio.Queue] = None,
+    ) -> CachedAudio:
+        try:
+            stream, media_type = await tts.synthesize_stream(config, text, overrides)
+            if listener is not None:
+                listener.put_nowait(media_type)
+            fd, temp_path = await asyncio.to_thread(self._create_part)
+            size = 0
+            try:
+                with os.fdopen(fd, "wb") as handle:
+                    async with aclosing(stream):
+                        async for chunk in stream:
+                            if not chunk:
+                                continue
+                            if listener is not None:
+                                listener.put_nowait(chunk)
+                            await asyncio.to_thread(handle.write, chunk)
+                            size += len(chunk)
+                if not size:
+                    raise tts.TTSConfigError("TTS engine returned no audio", status_code=502)
+                path = self.directory / f"{key}{MEDIA_EXTENSIONS.get(media_type, '.mp3')}"
+                await asyncio.to_thread(os.replace, temp_path, path)
+            except BaseException:
+                with suppress(OSError):
+                    os.unlink(temp_path)
+                raise
+        finally:
+            if listener is not None:
+                listener.put_nowait(None)
+        entry = CachedAudio(key=key, path=path, media_type=media_type, size=size)
+        self._store(entry)
+        return entry
+
+    def _create_part(self) -> Tuple[int, str]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=self.directory, suffix=".part")
+
+    @staticmethod
+    async def _tee(fill: "asyncio.Task[CachedAudio]", listener: asyncio.Queue) -> AsyncIterator[bytes]:
+        while True:
+            chunk = await listener.get()
+            if chunk is None:
+                break
+            yield chunk
+        await asyncio.shield(fill)
+
+    def _store(self, entry: CachedAudio) -> None:
+        self._discard(entry.key, unlink=False)
+        self._entries[entry.key] = entry
+        self._total_bytes += entry.size
+        # The newest entry is never evicted here: the caller is about to serve it.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key: str, *, unlink: bool = True) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.size
+        if unlink:
+            with suppress(OSError):
+                entry.path.unlink()
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.directory.is_dir():
+            return
+        found = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".part":
+                with suppress(OSError):
+                    path.unlink()
+                continue
+            media_type = EXTENSION_MEDIA_TYPES.get(path.suffix)
+            if media_type is None or not _KEY_PATTERN.match(path.stem):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime, CachedAudio(path.stem, path, media_type, stat.st_size)))
+        for _, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[entry.key] = entry
+            self._total_bytes += entry.size
+        while self._total_bytes > self.max_bytes and self._entries:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+        if self._entries:
+            logger.info("Loaded %s cached TTS clips (%s bytes)", len(self._entries), self._total_bytes)
+
+
+async def _open_file(path: Path) -> AsyncIterator[bytes]:
+    handle = await asyncio.to_thread(open, path, "rb")
+    return _read_file(handle)
+
+
+async def _read_file(handle: BinaryIO, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    with handle:
+        while True:
+            chunk = await asyncio.to_thread(handle.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def _fingerprint(secret: Optional[str]) -> str:
+    if not secret:
+        return ""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache
+def get_tts_cache() -> TTSAudioCache:
+    settings = get_settings()
+    return TTSAudioCache(
+        settings.tts_cache_dir,
+        settings.tts_cache_max_bytes,
+        settings.tts_cache_max_text_chars,
+    )
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from app.services.engines import EngineRuntimeConfig
+from app.services.providers import tts
+from app.services.socket_writer import OnOverflow, SendBytes, SendJson, SocketWriter
+from app.services.speech_synthesis import synthesize_in_order
+from app.services.text_segmenter import SentenceSegmenter
+
+logger = logging.getLogger(__name__)
+
+
+class TTSStreamSession:
+    def __init__(
+        self,
+        config: EngineRuntimeConfig,
+        overrides: Dict[str, Any],
+        *,
+        send_json: SendJson,
+        send_bytes: SendBytes,
+        concurrency: int = 2,
+        max_queue: int = 0,
+        on_overflow: Optional[OnOverflow] = None,
+    ) -> None:
+        self.config = config
+        self.overrides = overrides
+        self.concurrency = concurrency
+        self.max_queue = max(0, max_queue)
+        self._writer = SocketWriter(send_json, send_bytes, max_size=self.max_queue, on_overflow=on_overflow)
+        self._segmenter = SentenceSegmenter()
+        self._next_seq = 0
+        self._done_seq = -1
+        self._flushes: Deque[int] = deque()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def feed(self, text: str) -> None:
+        for segment in self._segmenter.feed(text):
+            self._enqueue(segment)
+
+    def flush(self) -> None:
+        tail = self._segmenter.flush()
+        if tail:
+            self._enqueue(tail)
+        last = self._next_seq - 1
+        if last <= self._done_seq:
+            self.send_json({"type": "flushed", "seq": last})
+        else:
+            self._flushes.append(last)
+
+    async def cancel(self) -> None:
+        await self._stop()
+        self._segmenter = SentenceSegmenter()
+        self._flushes.clear()
+        self._done_seq = self._next_seq - 1
+        # Audio already queued for the cancelled segments is dropped, not sent.
+        self._writer.discard()
+        self.send_json({"type": "cancelled", "seq": self._done_seq})
+
+    async def close(self) -> None:
+        await self._stop()
+        await self._writer.close()
+
+    def send_json(self, payload: Dict[str, Any]) -> None:
+        self._writer.send_json(payload)
+
+    def _enqueue(self, text: str) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(self.max_queue)
+            self._task = asyncio.create_task(self._run(self._queue, self._next_seq))
+        # Never wait for room here: the socket reader must stay free to see cancel and flush.
+        try:
+            self._queue.put_nowait((self._next_seq, text))
+        except asyncio.QueueFull:
+            self.send_json({"type": "error", "error": "Too many pending sentences; text rejected.", "text": text})
+            return
+        self._next_seq += 1
+
+    async def _stop(self) -> None:
+        task, self._task, self._queue = self._task, None, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self, queue: asyncio.Queue, base: int) -> None:
+        texts: Dict[int, str] = {}
+
+        async def segments() -> AsyncIterator[str]:
+            while True:
+                seq, text = await queue.get()
+                texts[seq] = text
+                yield text
+
+        async def synthesize(text: str) -> Tuple[AsyncIterator[bytes], str]:
+            return await tts.synthesize_stream(self.config, text, self.overrides)
+
+        current = base - 1
+        try:
+            chunks = synthesize_in_order(segments(), synthesize, concurrency=self.concurrency, mark_end=True)
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    seq = base + chunk.segment
+                    if seq != current:
+                        current = seq
+                        self.send_json(
+                            {
+                                "type": "segment.start",
+                                "seq": seq,
+                                "text": texts.get(seq, ""),
+                                "mediaType": chunk.media_type or None,
+                            }
+                        )
+                    if chunk.error:
+                        self.send_json({"type": "error", "seq": seq, "error": chunk.error})
+                    elif chunk.end:
+                        texts.pop(seq, None)
+                        self.send_json({"type": "segment.end", "seq": seq})
+                        self._finish(seq)
+                    else:
+                        await self._writer.send_bytes(chunk.data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("TTS stream session failed")
+
+    def _finish(self, seq: int) -> None:
+        self._done_seq = seq
+        while self._flushes and self._flushes[0] <= seq:
+            self.send_json({"type": "flushed", "seq": self._flushes.popleft()})
@@ -0,0 +1,155 @@
+import math
+import operator
+import sys
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+@dataclass
+class SpeechSegment:
+    pcm: bytes
+    start_ms: int
+    end_ms: int
+    forced: bool = False
+
+
+class EnergyVAD:
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        *,
+        threshold: float = 500.0,
+        frame_ms: int = 30,
+        silence_ms: int = 600,
+        min_speech_ms: int = 200,
+        max_segment_ms: int = 15000,
+        pre_roll_ms: int = 200,
+    ) -> None:
+        self.sample_rate = max(1, sample_rate)
+        self.channels = max(1, channels)
+        self.threshold = threshold
+        self.frame_ms = max(10, frame_ms)
+        self.frame_bytes = max(1, self.sample_rate * self.frame_ms // 1000) * self.channels * 2
+        self.silence_frames = max(1, silence_ms // self.frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // self.frame_ms)
+        self.max_segment_frames = max(self.silence_frames + 1, max_segment_ms // self.frame_ms)
+        self.pre_roll_frames = max(0, pre_roll_ms // self.frame_ms)
+        self._pending = bytearray()
+        self._pre_roll: Deque[bytes] = deque(maxlen=self.pre_roll_frames or None)
+        self._segment = bytearray()
+        self._segment_start = 0
+        self._position = 0
+        self._voiced = 0
+        self._silent = 0
+        self.in_speech = False
+
+    @property
+    def speech_ms(self) -> int:
+        return len(self._segment) // self.frame_bytes * self.frame_ms if self.in_speech else 0
+
+    def current(self) -> bytes:
+        return bytes(self._segment) if self.in_speech else b""
+
+    def feed(self, pcm: bytes) -> List[SpeechSegment]:
+        self._pending.extend(pcm)
+        usable = len(self._pending) - len(self._pending) % self.frame_bytes
+        if not usable:
+            return []
+        frames = bytes(self._pending[:usable])
+        del self._pending[:usable]
+        segments: List[SpeechSegment] = []
+        for index, level in enumerate(frame_levels(frames, self.frame_bytes)):
+            offset = index * self.frame_bytes
+            segment = self._step(frames[offset : offset + self.frame_bytes], level >= self.threshold)
+            if segment is not None:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> Optional[SpeechSegment]:
+        segment = None
+        if self.in_speech:
+            self._segment.extend(self._pending)
+            segment = self._close()
+        self.reset()
+        return segment
+
+    def reset(self) -> None:
+        self._pending.clear()
+        self._pre_roll.clear()
+        self._segment.clear()
+        self._voiced = 0
+        self._silent = 0
+        self.in_speech = False
+
+    def _step(self, frame: bytes, voiced: bool) -> Optional[SpeechSegment]:
+        self._position += 1
+        if not self.in_speech:
+            if not voiced:
+                if self.pre_roll_frames:
+                    self._pre_roll.append(frame)
+                return None
+            self.in_speech = True
+            self._segment_start = self._position - 1 - len(self._pre_roll)
+            for buffered in self._pre_roll:
+                self._segment.extend(buffered)
+            self._pre_roll.clear()
+
+        self._segment.extend(frame)
+        if voiced:
+            self._voiced += 1
+            self._silent = 0
+        else:
+            self._silent += 1
+
+        if self._silent >= self.silence_frames:
+            # Keep only a pre-roll's worth of the trailing silence.
+            trim = (self._silent - self.pre_roll_frames) * self.frame_bytes
+            if trim > 0:
+                del self._segment[-trim:]
+            segment = self._close()
+            self.in_speech = False
+            return segment
+        if len(self._segment) >= self.max_segment_frames * self.frame_bytes:
+            return self._close(forced=True)
+        return None
+
+    def _close(self, forced: bool = False) -> Optional[SpeechSegment]:
+        pcm = bytes(self._segment)
+        voiced = self._voiced
+        start_ms = self._segment_start * self.frame_ms
+        self._segment.clear()
+        self._voiced = 0
+        self._silent = 0
+        self._segment_start = self._position
+        if voiced < self.min_speech_frames:
+            return None
+        duration_ms = len(pcm) * 1000 // (self.sample_rate * self.channels * 2)
+        return SpeechSegment(pcm, start_ms, start_ms + duration_ms, forced)
+
+
+def frame_levels(pcm: bytes, frame_bytes: int) -> List[float]:
+    count = len(pcm) // frame_bytes
+    if not count:
+        return []
+    if np is not None:
+        samples = np.frombuffer(pcm, dtype="<i2", count=count * frame_bytes // 2).astype(np.float32)
+        samples = samples.reshape(count, -1)
+        return np.sqrt(np.mean(samples * samples, axis=1)).tolist()
+    samples = array("h")
+    samples.frombytes(pcm[: count * frame_bytes])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    width = frame_bytes // 2
+    levels = []
+    for start in range(0, len(samples), width):
+        frame = samples[start : start + width]
+        levels.append(math.sqrt(sum(map(operator.mul, frame, frame)) / width))
+    return levels
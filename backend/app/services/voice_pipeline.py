@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from app.core.events import make_event
+from app.core.settings import get_settings
+from app.services.audio_buffer import PCMBuffer
+from app.services.audio_preprocess import get_preprocessor, open_wav
+from app.services.engines.runtime_store import EngineRuntimeConfig
+from app.services.providers import asr, tts
+from app.services.speech_synthesis import synthesize_in_order
+from app.services.text_segmenter import SentenceSegmenter
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+ChatTurn = Callable[[str], AsyncIterator[Dict[str, Any]]]
+
+
+@dataclass
+class VoiceCapture:
+    sample_rate: int = 16000
+    channels: int = 1
+    max_bytes: int = 0
+    asr_engine: str = "default"
+    asr_config: Dict[str, Any] = field(default_factory=dict)
+    tts_engine: str = "default"
+    tts_config: Dict[str, Any] = field(default_factory=dict)
+    tts_enabled: bool = True
+    payload: Dict[str, Any] = field(default_factory=dict)
+    buffer: PCMBuffer = field(default_factory=PCMBuffer)
+    truncated: bool = False
+
+    async def append(self, chunk: bytes) -> bool:
+        if self.max_bytes and len(self.buffer) + len(chunk) > self.max_bytes:
+            room = max(0, self.max_bytes - len(self.buffer))
+            await self.buffer.write(chunk[:room])
+            self.truncated = True
+            return False
+        await self.buffer.write(chunk)
+        return True
+
+    def close(self) -> None:
+        self.buffer.close()
+
+
+class VoicePipeline:
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.max_seconds = settings.voice_max_seconds
+        self.asr_engine = settings.voice_asr_engine
+        self.tts_engine = settings.voice_tts_engine
+        self.tts_concurrency = settings.voice_tts_concurrency
+
+    def create_capture(self, payload: Dict[str, Any]) -> VoiceCapture:
+        sample_rate = _as_int(payload.get("sampleRate") or payload.get("sample_rate"), 16000)
+        channels = _as_int(payload.get("channels"), 1)
+        asr_config = payload.get("asrConfig")
+        tts_config = payload.get("ttsConfig")
+        settings = get_settings()
+        return VoiceCapture(
+            sample_rate=sample_rate,
+            channels=channels,
+            max_bytes=int(self.max_seconds * sample_rate * channels * 2),
+            asr_engine=str(payload.get("asrEngine") or self.asr_engine),
+            asr_config=asr_config if isinstance(asr_config, dict) else {},
+            tts_engine=str(payload.get("ttsEngine") or self.tts_engine),
+            tts_config=tts_config if isinstance(tts_config, dict) else {},
+            tts_enabled=payload.get("tts") is not False,
+            payload=dict(payload),
+            buffer=PCMBuffer(settings.asr_buffer_memory_bytes, settings.asr_buffer_dir),
+        )
+
+    async def run(
+        self,
+        session_id: str,
+        capture: VoiceCapture,
+        chat: ChatTurn,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        if not capture.buffer:
+            yield make_event("error", {"message": "Missing audio data"}, session_id=session_id)
+            return
+
+        try:
+            text = await self._transcribe(capture)
+        except asr.ASRConfigError as exc:
+            yield make_event("error", {"message": str(exc)}, session_id=session_id)
+            return
+        except Exception as exc:
+            yield make_event("error", {"message": f"ASR request failed: {exc}"}, session_id=session_id)
+            return
+        finally:
+            capture.close()
+
+        yield make_event("input.voice.transcript", {"text": text}, session_id=session_id)
+        if not text:
+            return
+
+        tts_config = self._resolve_tts(capture)
+        if tts_config is None:
+            async with aclosing(chat(text)) as events:
+                async for event in events:
+                    yield event
+            return
+
+        out: asyncio.Queue = asyncio.Queue()
+        sentences: asyncio.Queue = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(self._produce(chat(text), out, sentences)),
+            asyncio.create_task(
+                self._speak(session_id, tts_config, capture.tts_config, sentences, out, self.tts_concurrency)
+            ),
+        ]
+        try:
+            running = len(tasks)
+            while running:
+                item = await out.get()
+                if item is _DONE:
+                    running -= 1
+                    continue
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _transcribe(self, capture: VoiceCapture) -> str:
+        config = asr.get_engine_config(asr.resolve_engine_id(capture.asr_engine))
+        preprocessor = get_preprocessor(config, capture.sample_rate, capture.channels)
+        async with open_wav(preprocessor, capture.buffer) as audio:
+            if audio is None:
+                return ""
+            result = await asr.transcribe(config, audio, capture.asr_config, "audio.wav", "audio/wav")
+        return asr.extract_text(result).strip()
+
+    def _resolve_tts(self, capture: VoiceCapture) -> Optional[EngineRuntimeConfig]:
+        if not capture.tts_enabled:
+            return None
+        try:
+            return tts.get_engine_config(tts.resolve_engine_id(capture.tts_engine))
+        except tts.TTSConfigError:
+            return None
+
+    @staticmethod
+    async def _produce(
+        events: AsyncIterator[Dict[str, Any]],
+        out: asyncio.Queue,
+        sentences: asyncio.Queue,
+    ) -> None:
+        segmenter = SentenceSegmenter()
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    out.put_nowait(event)
+                    if event.get("type") != "output.chat.delta":
+                        continue
+                    for sentence in segmenter.feed(str(event["data"].get("text") or "")):
+                        sentences.put_nowait(sentence)
+            tail = segmenter.flush()
+            if tail:
+                sentences.put_nowait(tail)
+        finally:
+            sentences.put_nowait(None)
+            out.put_nowait(_DONE)
+
+    @staticmethod
+    async def _speak(
+        session_id: str,
+        config: EngineRuntimeConfig,
+        overrides: Dict[str, Any],
+        sentences: asyncio.Queue,
+        out: asyncio.Queue,
+        concurrency: int,
+    ) -> None:
+        async def segments() -> AsyncIterator[str]:
+            while True:
+                sentence = await sentences.get()
+                if sentence is None:
+                    return
+                yield sentence
+
+        async def synthesize(text: str):
+            return await tts.synthesize_stream(config, text, overrides)
+
+        seq = 0
+        started = False
+        try:
+            chunks = synthesize_in_order(segments(), synthesize, concurrency=concurrency)
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    if chunk.error:
+                        logger.warning("TTS failed for session %s: %s", session_id, chunk.error)
+                        out.put_nowait(
+                            make_event(
+                                "error",
+                                {"message": f"TTS request failed: {chunk.error}"},
+                                session_id=session_id,
+                            )
+                        )
+                        continue
+                    if not started:
+                        out.put_nowait(
+                            make_event("output.speech.start", {"mediaType": chunk.media_type}, session_id=session_id)
+                        )
+                        started = True
+                    out.put_nowait(
+                        make_event(
+                            "output.speech.chunk",
+                            {"audio": chunk.data, "seq": seq, "segment": chunk.segment},
+                            session_id=session_id,
+                            include_legacy_payload=False,
+                        )
+                    )
+                    seq += 1
+            if started:
+                out.put_nowait(make_event("output.speech.end", {}, session_id=session_id))
+                out.put_nowait(make_event("tts.end", {}, session_id=session_id))
+        finally:
+            out.put_nowait(_DONE)
+
+
+def _as_int(value: Any, fallback: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return fallback
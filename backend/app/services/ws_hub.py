@@ -1,13 +1,31 @@
+import asyncio
+import logging
 import time
 import uuid
+from contextlib import aclosing
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Set
 
 from fastapi import WebSocket
 
-from app.core.events import EventEnvelope, make_event, parse_event
+from app.core.events import (
+    LEGACY_EVENT_TYPES,
+    MSGPACK_AVAILABLE,
+    PROTOCOL_COMPACT,
+    PROTOCOL_LEGACY,
+    EventEnvelope,
+    make_event,
+    parse_event,
+)
 from app.core.settings import get_settings
 from app.services.event_dispatcher import EventDispatcher
+from app.services.session_executor import SessionExecutor
+from app.services.ws_outbox import OutboundFrame, PeerOutbox
+from app.services.ws_routing import WILDCARD, RoutingIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COALESCE_MS = 50
 
 
 @dataclass
@@ -19,6 +37,10 @@ class PeerState:
     index: Optional[int] = None
     possible_events: Set[str] = field(default_factory=set)
     active_voice_session_id: Optional[str] = None
+    protocol: int = PROTOCOL_LEGACY
+    wire_format: str = "json"
+    outbox: PeerOutbox = field(default_factory=PeerOutbox)
+    writer: Optional[asyncio.Task] = None
 
 
 class WebSocketHub:
@@ -26,13 +48,34 @@ class WebSocketHub:
         self.dispatcher = dispatcher
         self._peers: Dict[str, PeerState] = {}
         self._peers_by_module: Dict[str, Dict[Optional[int], PeerState]] = {}
-        self._auth_token = get_settings().ws_auth_token
+        self._routes = RoutingIndex()
+        self._tasks: Set[asyncio.Task] = set()
+        settings = get_settings()
+        self._executor = SessionExecutor(settings.ws_session_queue_size)
+        self._auth_token = settings.ws_auth_token
+        self._send_queue_size = settings.ws_send_queue_size
+        self._send_overflow = settings.ws_send_overflow.lower()
+        self._coalesce_ms = settings.ws_delta_coalesce_ms
+        self._coalesce_chars = settings.ws_delta_coalesce_chars
 
     async def connect(self, ws: WebSocket) -> PeerState:
         await ws.accept()
         peer_id = uuid.uuid4().hex
-        peer = PeerState(id=peer_id, ws=ws, authenticated=not bool(self._auth_token))
+        peer = PeerState(
+            id=peer_id,
+            ws=ws,
+            authenticated=not bool(self._auth_token),
+            outbox=PeerOutbox(
+                self._send_queue_size,
+                self._send_overflow,
+                self._coalesce_ms,
+                self._coalesce_chars,
+            ),
+        )
+        peer.outbox.on_overflow = lambda: self._handle_overflow(peer)
+        peer.writer = asyncio.create_task(self._write_loop(peer))
         self._peers[peer_id] = peer
+        self._routes.add_peer(peer_id)
         if peer.authenticated:
             await self._send(peer, make_event("module.authenticated", {"authenticated": True}))
         return peer
@@ -40,7 +83,19 @@ class WebSocketHub:
     async def disconnect(self, peer: PeerState) -> None:
         if peer.id in self._peers:
             self._peers.pop(peer.id, None)
+        sessions = self._routes.sessions(peer.id)
+        if peer.active_voice_session_id:
+            sessions.add(peer.active_voice_session_id)
+        self._routes.remove_peer(peer.id)
         self._unregister_module(peer)
+        peer.outbox.close()
+        if peer.writer and peer.writer is not asyncio.current_task():
+            peer.writer.cancel()
+        for session_id in sessions:
+            # Nobody is left to hear the session, so stop its turns and free any half-finished capture.
+            if session_id != WILDCARD and not self._routes.session_peers(session_id):
+                self._executor.cancel(session_id)
+                self.dispatcher.release_session(session_id)
 
     async def handle_text(self, peer: PeerState, raw: str) -> None:
         try:
@@ -63,20 +118,29 @@ class WebSocketHub:
             await self._send(peer, make_event("error", {"message": "not authenticated"}))
             return
 
+        if event.type in ("module.subscribe", "module.unsubscribe"):
+            await self._handle_subscribe(peer, event)
+            return
+
         if not event.source and peer.name:
             event.source = peer.name
 
         if event.type == "input.voice.start":
-            peer.active_voice_session_id = event.session_id
+            peer.active_voice_session_id = self.dispatcher.resolve_session_id(event)
+        ended = False
         if event.type == "input.voice.end":
+            event.session_id = event.session_id or peer.active_voice_session_id
             peer.active_voice_session_id = None
+            # Detach the capture now; audio that arrives while the turn is queued belongs to the next one.
+            ended = self.dispatcher.end_capture(event)
 
-        responses = await self.dispatcher.dispatch(event)
-
-        if responses:
-            await self._broadcast_json(responses)
-
-        await self._broadcast_json([self._normalize_outgoing(event)], exclude_peer=peer.id)
+        if event.session_id:
+            self._routes.bind_sessions(peer.id, [event.session_id])
+        if self.dispatcher.runs_inline(event):
+            await self._process(peer, event, echo=True)
+            return
+        if not await self._schedule(peer, event, echo=True) and ended:
+            self.dispatcher.discard_ended_capture(self.dispatcher.resolve_session_id(event))
 
     async def handle_bytes(self, peer: PeerState, chunk: bytes) -> None:
         if not peer.authenticated:
@@ -94,9 +158,52 @@ class WebSocketHub:
             session_id=peer.active_voice_session_id,
             source=peer.name or None,
         )
-        responses = await self.dispatcher.dispatch(event)
-        if responses:
-            await self._broadcast_json(responses)
+        await self._process(peer, event)
+
+    async def _schedule(self, peer: PeerState, event: EventEnvelope, *, echo: bool = False) -> bool:
+        session_id = self.dispatcher.resolve_session_id(event)
+        if self._executor.submit(session_id, lambda: self._process(peer, event, echo=echo)):
+            return True
+        logger.warning("Session %s queue full, rejecting %s", session_id, event.type)
+        await self._send(
+            peer,
+            make_event(
+                "error",
+                {
+                    "message": "session queue full",
+                    "type": event.type,
+                    "depth": self._executor.depth(session_id),
+                },
+                session_id=session_id,
+            ),
+        )
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        peers = list(self._peers.values())
+        return {
+            "peers": len(peers),
+            "sessions": self._executor.stats(),
+            "outbox": {
+                "queued": sum(len(peer.outbox) for peer in peers),
+                "dropped": sum(peer.outbox.dropped for peer in peers),
+                "coalesced": sum(peer.outbox.coalesced for peer in peers),
+            },
+        }
+
+    async def _process(self, peer: PeerState, event: EventEnvelope, *, echo: bool = False) -> None:
+        try:
+            async with aclosing(self.dispatcher.stream(event)) as responses:
+                async for response in responses:
+                    self._bind_response_session(peer, response)
+                    await self._broadcast_json([response], origin=peer.id)
+        finally:
+            if echo:
+                await self._broadcast_json(
+                    [self._normalize_outgoing(event)],
+                    exclude_peer=peer.id,
+                    inbound=True,
+                )
 
     async def _handle_authenticate(self, peer: PeerState, event: EventEnvelope) -> None:
         token = event.data.get("token")
@@ -114,6 +221,9 @@ class WebSocketHub:
         name = event.data.get("name")
         index = event.data.get("index")
         possible_events = event.data.get("possibleEvents") or []
+        coalesce = event.data.get("coalesce")
+        protocol = event.data.get("protocol", PROTOCOL_LEGACY)
+        encoding = event.data.get("encoding") or "json"
 
         if not isinstance(name, str) or not name:
             await self._send(
@@ -129,11 +239,105 @@ class WebSocketHub:
             )
             return
 
+        if protocol not in (PROTOCOL_LEGACY, PROTOCOL_COMPACT) or encoding not in ("json", "msgpack"):
+            await self._send(
+                peer,
+                make_event("error", {"message": "module.announce protocol must be 1 or 2 and encoding json or msgpack"}),
+            )
+            return
+
+        if coalesce is not None and not isinstance(coalesce, (bool, dict)):
+            await self._send(
+                peer,
+                make_event("error", {"message": "module.announce coalesce must be an object or boolean"}),
+            )
+            return
+
         self._unregister_module(peer)
         peer.name = name
         peer.index = index
         peer.possible_events = set(str(item) for item in possible_events if isinstance(item, str))
+        self._routes.announce(peer.id, peer.possible_events)
         self._register_module(peer)
+        if coalesce is not None:
+            self._configure_coalescing(peer, coalesce)
+        await self._negotiate_protocol(peer, protocol, encoding)
+
+    async def _negotiate_protocol(self, peer: PeerState, protocol: int, encoding: str) -> None:
+        peer.protocol = protocol
+        if protocol == PROTOCOL_LEGACY:
+            peer.wire_format = "json"
+            return
+        if encoding == "msgpack" and not MSGPACK_AVAILABLE:
+            logger.warning("Peer %s requested msgpack but it is not installed; using JSON", peer.id)
+            encoding = "json"
+        peer.wire_format = "msgpack" if encoding == "msgpack" else "compact"
+        await self._send(
+            peer,
+            make_event(
+                "module.protocol",
+                {"protocol": protocol, "encoding": encoding},
+                include_legacy_payload=False,
+            ),
+        )
+
+    def _configure_coalescing(self, peer: PeerState, coalesce: Any) -> None:
+        options = coalesce if isinstance(coalesce, dict) else {}
+        window_ms = options.get("windowMs", self._coalesce_ms)
+        max_chars = options.get("maxChars", self._coalesce_chars)
+        if coalesce is False:
+            window_ms, max_chars = 0, 0
+        elif coalesce is True and not window_ms and not max_chars:
+            window_ms = DEFAULT_COALESCE_MS
+        configured = peer.outbox.configure_coalescing(
+            window_ms if isinstance(window_ms, int) else 0,
+            max_chars if isinstance(max_chars, int) else 0,
+        )
+        if not configured:
+            self._handle_overflow(peer)
+
+    async def _handle_subscribe(self, peer: PeerState, event: EventEnvelope) -> None:
+        events = self._coerce_names(event.data.get("events"))
+        sessions = self._coerce_names(event.data.get("sessions"))
+        if events is None or sessions is None:
+            await self._send(
+                peer,
+                make_event("error", {"message": f"{event.type} events and sessions must be string lists"}),
+            )
+            return
+
+        if event.type == "module.subscribe":
+            self._routes.subscribe(peer.id, events)
+            self._routes.bind_sessions(peer.id, sessions)
+        else:
+            self._routes.unsubscribe(peer.id, events)
+            self._routes.unbind_sessions(peer.id, sessions)
+
+        await self._send(
+            peer,
+            make_event(
+                "module.subscribed",
+                {
+                    "events": sorted(self._routes.subscriptions(peer.id)),
+                    "sessions": sorted(self._routes.sessions(peer.id)),
+                },
+            ),
+        )
+
+    def _bind_response_session(self, peer: PeerState, response: Dict[str, Any]) -> None:
+        session_id = response.get("sessionId")
+        if isinstance(session_id, str) and session_id:
+            self._routes.bind_sessions(peer.id, [session_id])
+
+    @staticmethod
+    def _coerce_names(value: Any) -> Optional[List[str]]:
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [value]
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            return None
+        return [item for item in value if item]
 
     async def _handle_ui_configure(self, peer: PeerState, event: EventEnvelope) -> None:
         module_name = event.data.get("moduleName")
@@ -174,24 +378,77 @@ class WebSocketHub:
             self._peers_by_module.pop(peer.name, None)
 
     async def _send(self, peer: PeerState, event: Dict[str, Any]) -> None:
-        try:
-            await peer.ws.send_json(event)
-        except Exception:
-            await self.disconnect(peer)
+        self._enqueue(peer, OutboundFrame(event))
 
     async def _broadcast_json(
         self,
         events: List[Dict[str, Any]],
         *,
         exclude_peer: Optional[str] = None,
+        inbound: bool = False,
+        origin: Optional[str] = None,
     ) -> None:
-        for peer_id, peer in list(self._peers.items()):
-            if exclude_peer and peer_id == exclude_peer:
-                continue
-            if not peer.authenticated:
-                continue
-            for event in events:
-                await self._send(peer, event)
+        for event in events:
+            frame = OutboundFrame(event)
+            audio = frame.is_audio
+            recipients = self._routes.recipients(
+                frame.type or "",
+                frame.session_id,
+                inbound=inbound,
+                opt_in=audio,
+            )
+            if audio and origin:
+                recipients.add(origin)
+            recipients.discard(exclude_peer)
+            legacy_only = frame.type in LEGACY_EVENT_TYPES
+            for peer_id in recipients:
+                peer = self._peers.get(peer_id)
+                if peer is None or not peer.authenticated:
+                    continue
+                if legacy_only and peer.protocol != PROTOCOL_LEGACY:
+                    continue
+                self._enqueue(peer, frame)
+
+    def _enqueue(self, peer: PeerState, frame: OutboundFrame) -> bool:
+        if peer.outbox.put(frame):
+            return True
+        self._handle_overflow(peer)
+        return False
+
+    def _handle_overflow(self, peer: PeerState) -> None:
+        if peer.outbox.closed:
+            return
+        logger.warning("Dropping slow WebSocket peer %s (outbox full)", peer.id)
+        peer.outbox.close()
+        self._spawn(self._drop_peer(peer))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _write_loop(self, peer: PeerState) -> None:
+        while True:
+            frame = await peer.outbox.get()
+            if frame is None:
+                return
+            try:
+                encoded = frame.encode(peer.wire_format)
+                if isinstance(encoded, bytes):
+                    await peer.ws.send_bytes(encoded)
+                else:
+                    await peer.ws.send_text(encoded)
+            except Exception:
+                await self.disconnect(peer)
+                return
+
+    async def _drop_peer(self, peer: PeerState) -> None:
+        await self.disconnect(peer)
+        try:
+            await peer.ws.close(code=1013)
+        except Exception:
+            pass
 
     @staticmethod
     def _normalize_outgoing(event: EventEnvelope) -> Dict[str, Any]:
@@ -0,0 +1,230 @@
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from app.core.events import encode_event_as, event_audio
+
+OVERFLOW_POLICIES = frozenset({"drop_oldest", "coalesce", "disconnect"})
+DELTA_EVENT_TYPES = frozenset({"output.chat.delta", "llm.delta"})
+
+
+class OutboundFrame:
+    __slots__ = ("event", "_encoded", "_merged")
+
+    def __init__(self, event: Dict[str, Any]) -> None:
+        self.event = event
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+        self._merged: Optional[Dict[Tuple["OutboundFrame", ...], "OutboundFrame"]] = None
+
+    @property
+    def type(self) -> Optional[str]:
+        return self.event.get("type")
+
+    @property
+    def session_id(self) -> Optional[str]:
+        return self.event.get("sessionId")
+
+    @property
+    def is_audio(self) -> bool:
+        return event_audio(self.event) is not None
+
+    def encode(self, wire_format: str = "json") -> Union[str, bytes]:
+        encoded = self._encoded.get(wire_format)
+        if encoded is None:
+            encoded = encode_event_as(self.event, wire_format)
+            self._encoded[wire_format] = encoded
+        return encoded
+
+    def merged_with(self, following: Tuple["OutboundFrame", ...]) -> "OutboundFrame":
+        # Peers that coalesced the same run of frames share one merged frame and its encodings.
+        if self._merged is None:
+            self._merged = {}
+        merged = self._merged.get(following)
+        if merged is None:
+            frames = (self, *following)
+            ts = self.event.get("ts")
+            for frame in following:
+                ts = frame.event.get("ts", ts)
+            text = "".join(_delta_text(frame.event) for frame in frames)
+            merged = OutboundFrame(_with_text(self.event, text, ts))
+            self._merged[following] = merged
+        return merged
+
+
+class PendingDelta:
+    __slots__ = ("frames", "chars")
+
+    def __init__(self) -> None:
+        self.frames: List[OutboundFrame] = []
+        self.chars = 0
+
+    def add(self, frame: OutboundFrame) -> None:
+        self.frames.append(frame)
+        self.chars += len(_delta_text(frame.event))
+
+    def frame(self) -> OutboundFrame:
+        if len(self.frames) == 1:
+            return self.frames[0]
+        return self.frames[0].merged_with(tuple(self.frames[1:]))
+
+
+class PeerOutbox:
+    def __init__(
+        self,
+        max_size: int = 256,
+        policy: str = "drop_oldest",
+        coalesce_ms: int = 0,
+        coalesce_chars: int = 0,
+    ) -> None:
+        self.max_size = max(1, max_size)
+        self.policy = policy if policy in OVERFLOW_POLICIES else "drop_oldest"
+        self.coalesce_ms = max(0, coalesce_ms)
+        self.coalesce_chars = max(0, coalesce_chars)
+        self.dropped = 0
+        self.coalesced = 0
+        self._queue: Deque[OutboundFrame] = deque()
+        self._pending: Dict[Tuple[Optional[str], Optional[str]], PendingDelta] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.on_overflow: Optional[Callable[[], None]] = None
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def coalescing(self) -> bool:
+        return self.coalesce_ms > 0 or self.coalesce_chars > 0
+
+    def configure_coalescing(self, coalesce_ms: int, coalesce_chars: int) -> bool:
+        self.coalesce_ms = max(0, coalesce_ms)
+        self.coalesce_chars = max(0, coalesce_chars)
+        if not self.coalescing:
+            return self.flush()
+        return True
+
+    def put(self, frame: OutboundFrame) -> bool:
+        if self._closed:
+            return False
+        if self.coalescing and frame.type in DELTA_EVENT_TYPES:
+            return self._hold(frame)
+        if self._pending and not self.flush():
+            return False
+        return self._append(frame)
+
+    def flush(self) -> bool:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for delta in pending:
+            if not self._append(delta.frame()):
+                return False
+        return True
+
+    def _hold(self, frame: OutboundFrame) -> bool:
+        key = (frame.session_id, frame.type)
+        delta = self._pending.get(key)
+        if delta is None:
+            delta = PendingDelta()
+            self._pending[key] = delta
+        else:
+            self.coalesced += 1
+        delta.add(frame)
+        if self.coalesce_chars and delta.chars >= self.coalesce_chars:
+            return self.flush()
+        if self.coalesce_ms and self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.coalesce_ms / 1000, self._flush_later)
+        return True
+
+    def _flush_later(self) -> None:
+        self._flush_handle = None
+        if not self._closed and not self.flush() and self.on_overflow:
+            self.on_overflow()
+
+    def _append(self, frame: OutboundFrame) -> bool:
+        if self._closed:
+            return False
+        if len(self._queue) >= self.max_size:
+            if self.policy == "disconnect":
+                return False
+            if self.policy == "coalesce" and self._coalesce_tail(frame):
+                self._ready.set()
+                return True
+            if not self._drop_oldest_delta():
+                return False
+        self._queue.append(frame)
+        self._ready.set()
+        return True
+
+    async def get(self) -> Optional[OutboundFrame]:
+        while not self._queue:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+    def close(self) -> None:
+        self._closed = True
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending.clear()
+        self._queue.clear()
+        self._ready.set()
+
+    def _drop_oldest_delta(self) -> bool:
+        for index, queued in enumerate(self._queue):
+            if queued.type in DELTA_EVENT_TYPES:
+                del self._queue[index]
+                self.dropped += 1
+                return True
+        return False
+
+    def _coalesce_tail(self, frame: OutboundFrame) -> bool:
+        if frame.type not in DELTA_EVENT_TYPES:
+            return False
+        for index in range(len(self._queue) - 1, -1, -1):
+            queued = self._queue[index]
+            if queued.session_id != frame.session_id:
+                continue
+            if queued.type not in DELTA_EVENT_TYPES:
+                return False
+            if queued.type != frame.type:
+                continue
+            self._queue[index] = OutboundFrame(merge_delta_events(queued.event, frame.event))
+            self.coalesced += 1
+            return True
+        return False
+
+
+def merge_delta_events(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    return _with_text(
+        first,
+        f"{_delta_text(first)}{_delta_text(second)}",
+        second.get("ts", first.get("ts")),
+    )
+
+
+def _delta_text(event: Dict[str, Any]) -> str:
+    data = event.get("data")
+    if not isinstance(data, dict):
+        return ""
+    text = data.get("text")
+    return text if isinstance(text, str) else ""
+
+
+def _with_text(event: Dict[str, Any], text: str, ts: Any) -> Dict[str, Any]:
+    data = event.get("data") if isinstance(event.get("data"), dict) else {}
+    data = {**data, "text": text}
+    merged = {**event, "data": data, "ts": ts}
+    if "payload" in event:
+        merged["payload"] = data
+    return merged
@@ -0,0 +1,160 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+WILDCARD = "*"
+
+
+class RoutingIndex:
+    def __init__(self) -> None:
+        self._peers: Set[str] = set()
+        self._unscoped: Set[str] = set()
+        self._by_session: Dict[str, Set[str]] = {}
+        self._by_subscription: Dict[str, Set[str]] = {}
+        self._by_announcement: Dict[str, Set[str]] = {}
+        self._peer_sessions: Dict[str, Set[str]] = {}
+        self._peer_subscriptions: Dict[str, Set[str]] = {}
+        self._peer_announcements: Dict[str, Set[str]] = {}
+
+    def add_peer(self, peer_id: str) -> None:
+        self._peers.add(peer_id)
+        self._unscoped.add(peer_id)
+        self._peer_sessions.setdefault(peer_id, set())
+        self._peer_subscriptions.setdefault(peer_id, set())
+        self._peer_announcements.setdefault(peer_id, set())
+
+    def remove_peer(self, peer_id: str) -> None:
+        self._peers.discard(peer_id)
+        self._unscoped.discard(peer_id)
+        for session_id in self._peer_sessions.pop(peer_id, set()):
+            _discard(self._by_session, session_id, peer_id)
+        for pattern in self._peer_subscriptions.pop(peer_id, set()):
+            _discard(self._by_subscription, pattern, peer_id)
+        for pattern in self._peer_announcements.pop(peer_id, set()):
+            _discard(self._by_announcement, pattern, peer_id)
+
+    def bind_sessions(self, peer_id: str, session_ids: Iterable[str]) -> None:
+        sessions = self._peer_sessions.get(peer_id)
+        if sessions is None:
+            return
+        for session_id in session_ids:
+            if not session_id or session_id in sessions:
+                continue
+            sessions.add(session_id)
+            if session_id != WILDCARD:
+                self._by_session.setdefault(session_id, set()).add(peer_id)
+        self._refresh_scope(peer_id)
+
+    def unbind_sessions(self, peer_id: str, session_ids: Iterable[str]) -> None:
+        sessions = self._peer_sessions.get(peer_id)
+        if sessions is None:
+            return
+        for session_id in session_ids:
+            if session_id not in sessions:
+                continue
+            sessions.discard(session_id)
+            _discard(self._by_session, session_id, peer_id)
+        self._refresh_scope(peer_id)
+
+    def subscribe(self, peer_id: str, event_types: Iterable[str]) -> None:
+        subscriptions = self._peer_subscriptions.get(peer_id)
+        if subscriptions is None:
+            return
+        for pattern in event_types:
+            if not pattern:
+                continue
+            subscriptions.add(pattern)
+            self._by_subscription.setdefault(pattern, set()).add(peer_id)
+
+    def unsubscribe(self, peer_id: str, event_types: Iterable[str]) -> None:
+        subscriptions = self._peer_subscriptions.get(peer_id)
+        if subscriptions is None:
+            return
+        for pattern in event_types:
+            subscriptions.discard(pattern)
+            _discard(self._by_subscription, pattern, peer_id)
+
+    def announce(self, peer_id: str, event_types: Iterable[str]) -> None:
+        announcements = self._peer_announcements.get(peer_id)
+        if announcements is None:
+            return
+        for pattern in announcements:
+            _discard(self._by_announcement, pattern, peer_id)
+        announcements.clear()
+        for pattern in event_types:
+            if not pattern:
+                continue
+            announcements.add(pattern)
+            self._by_announcement.setdefault(pattern, set()).add(peer_id)
+
+    def sessions(self, peer_id: str) -> Set[str]:
+        return set(self._peer_sessions.get(peer_id, set()))
+
+    def session_peers(self, session_id: str) -> Set[str]:
+        return set(self._by_session.get(session_id, set()))
+
+    def subscriptions(self, peer_id: str) -> Set[str]:
+        return set(self._peer_subscriptions.get(peer_id, set()))
+
+    def recipients(
+        self,
+        event_type: str,
+        session_id: Optional[str],
+        *,
+        inbound: bool = False,
+        opt_in: bool = False,
+    ) -> Set[str]:
+        if session_id:
+            scope = self._unscoped | self._by_session.get(session_id, set())
+        else:
+            scope = set(self._peers)
+        if not scope:
+            return scope
+
+        patterns = _patterns(event_type)
+        interested = _union(self._by_subscription, patterns)
+        announced = _union(self._by_announcement, patterns)
+        if inbound:
+            interested |= announced
+        if opt_in:
+            return scope & interested
+        subscribed = {peer_id for peer_id in scope if self._peer_subscriptions.get(peer_id)}
+        # Without subscriptions, a peer's announced events are its interest filter,
+        # on top of everything for the sessions it is bound to.
+        announced_only = {peer_id for peer_id in scope - subscribed if self._peer_announcements.get(peer_id)}
+        bound = self._by_session.get(session_id, set()) if session_id else set()
+        interested |= announced_only & (announced | bound)
+        filtered = subscribed | announced_only
+        return (scope - filtered) | (scope & interested)
+
+    def _refresh_scope(self, peer_id: str) -> None:
+        sessions = self._peer_sessions.get(peer_id) or set()
+        if not sessions or WILDCARD in sessions:
+            self._unscoped.add(peer_id)
+        else:
+            self._unscoped.discard(peer_id)
+
+
+def _patterns(event_type: str) -> List[str]:
+    parts = event_type.split(".")
+    patterns = [event_type]
+    for index in range(len(parts) - 1, 0, -1):
+        patterns.append(".".join(parts[:index]) + ".*")
+    patterns.append(WILDCARD)
+    return patterns
+
+
+def _union(index: Dict[str, Set[str]], keys: Iterable[str]) -> Set[str]:
+    result: Set[str] = set()
+    for key in keys:
+        peers = index.get(key)
+        if peers:
+            result |= peers
+    return result
+
+
+def _discard(index: Dict[str, Set[str]], key: str, peer_id: str) -> None:
+    peers = index.get(key)
+    if not peers:
+        return
+    peers.discard(peer_id)
+    if not peers:
+        index.pop(key, None)
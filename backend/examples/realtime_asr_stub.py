@@ -0,0 +1,94 @@
+import json
+import math
+import sys
+from array import array
+from typing import Any, Dict
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+app = FastAPI(title="WhaleWhisper Realtime ASR Stub")
+
+FRAME_MS = 100
+THRESHOLD = 500.0
+SILENCE_FRAMES = 6
+PARTIAL_FRAMES = 5
+
+
+class Utterance:
+    def __init__(self, sample_rate: int, channels: int) -> None:
+        self.frame_bytes = max(1, sample_rate * FRAME_MS // 1000) * max(1, channels) * 2
+        self.pending = bytearray()
+        self.count = 0
+        self.voiced = 0
+        self.silent = 0
+
+    def feed(self, pcm: bytes):
+        self.pending.extend(pcm)
+        while len(self.pending) >= self.frame_bytes:
+            frame = bytes(self.pending[: self.frame_bytes])
+            del self.pending[: self.frame_bytes]
+            yield from self.step(rms(frame) >= THRESHOLD)
+
+    def step(self, voiced: bool):
+        if voiced:
+            self.voiced += 1
+            self.silent = 0
+            if self.voiced % PARTIAL_FRAMES == 0:
+                yield {"type": "partial", "text": self.describe()}
+        elif self.voiced:
+            self.silent += 1
+            if self.silent >= SILENCE_FRAMES:
+                yield self.final()
+
+    def final(self) -> Dict[str, Any]:
+        payload = {"type": "final", "text": self.describe()}
+        self.count += 1
+        self.voiced = 0
+        self.silent = 0
+        return payload
+
+    def describe(self) -> str:
+        return f"utterance {self.count + 1} ({self.voiced * FRAME_MS / 1000:.1f}s)"
+
+
+def rms(frame: bytes) -> float:
+    samples = array("h")
+    samples.frombytes(frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return math.sqrt(sum(sample * sample for sample in samples) / max(1, len(samples)))
+
+
+@app.get("/health")
+async def health() -> Dict[str, str]:
+    return {"status": "ok"}
+
+
+@app.websocket("/realtime")
+async def realtime(websocket: WebSocket) -> None:
+    await websocket.accept()
+    utterance = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                return
+            if message.get("text") is not None:
+                payload = json.loads(message["text"])
+                if payload.get("type") == "start":
+                    utterance = Utterance(int(payload.get("sample_rate") or 16000), int(payload.get("channels") or 1))
+                elif payload.get("type") == "stop":
+                    if utterance is not None and utterance.voiced:
+                        await websocket.send_json(utterance.final())
+                    await websocket.send_json({"type": "done"})
+                    await websocket.close()
+                    return
+            elif message.get("bytes") is not None:
+                if utterance is None:
+                    await websocket.send_json({"type": "error", "error": "Send start before audio."})
+                    await websocket.close()
+                    return
+                for event in utterance.feed(message["bytes"]):
+                    await websocket.send_json(event)
+    except WebSocketDisconnect:
+        return
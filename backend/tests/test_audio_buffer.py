@@ -0,0 +1,40 @@
+import asyncio
+
+from app.services.audio_buffer import PCMBuffer
+
+
+def test_write_spills_to_disk_and_reads_back_in_order():
+    async def scenario():
+        buffer = PCMBuffer(max_memory_bytes=8)
+        chunks = [bytes([index]) * 5 for index in range(6)]
+        for chunk in chunks:
+            await buffer.write(chunk)
+        await buffer.settle()
+        assert buffer.spilled > 0
+        assert len(buffer) == 30
+        target = bytearray(30)
+        view = memoryview(target)
+        offset = 0
+        while offset < len(buffer):
+            offset += buffer.readinto_at(offset, view[offset:])
+        buffer.close()
+        assert bytes(target) == b"".join(chunks)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_writes_keep_every_frame():
+    async def scenario():
+        buffer = PCMBuffer(max_memory_bytes=4)
+        await asyncio.gather(*(buffer.write(bytes([index]) * 3) for index in range(10)))
+        await buffer.settle()
+        assert len(buffer) == 30
+        target = bytearray(30)
+        view = memoryview(target)
+        offset = 0
+        while offset < len(buffer):
+            offset += buffer.readinto_at(offset, view[offset:])
+        buffer.close()
+        assert sorted(target) == sorted(b"".join(bytes([index]) * 3 for index in range(10)))
+
+    asyncio.run(scenario())
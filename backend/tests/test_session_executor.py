@@ -0,0 +1,52 @@
+import asyncio
+
+from app.services.session_executor import SessionExecutor
+
+
+def test_submit_after_cancel_in_same_tick_runs():
+    async def scenario():
+        executor = SessionExecutor()
+        started = asyncio.Event()
+        ran = asyncio.Event()
+
+        async def long_turn():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def next_turn():
+            ran.set()
+
+        assert executor.submit("s", long_turn)
+        await started.wait()
+        executor.cancel("s")
+        assert executor.submit("s", next_turn)
+        await asyncio.wait_for(ran.wait(), 1)
+        await asyncio.sleep(0)
+        assert executor.stats()["sessions"] == 0
+        assert executor.depth("s") == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_drops_queued_jobs():
+    async def scenario():
+        executor = SessionExecutor()
+        started = asyncio.Event()
+        calls = []
+
+        async def long_turn():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def queued():
+            calls.append("queued")
+
+        executor.submit("s", long_turn)
+        executor.submit("s", queued)
+        await started.wait()
+        executor.cancel("s")
+        await asyncio.sleep(0.01)
+        assert calls == []
+        assert executor.stats()["sessions"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+from app.services.ws_routing import RoutingIndex
+
+
+def test_announced_only_peer_skips_unrelated_events():
+    routes = RoutingIndex()
+    routes.add_peer("plain")
+    routes.add_peer("module")
+    routes.announce("module", ["input.text"])
+
+    assert routes.recipients("output.chat.delta", None) == {"plain"}
+    assert routes.recipients("input.text", None, inbound=True) == {"plain", "module"}
+
+
+def test_announced_only_peer_receives_bound_session_events():
+    routes = RoutingIndex()
+    routes.add_peer("client")
+    routes.add_peer("other")
+    routes.announce("client", ["input.text"])
+    routes.bind_sessions("client", ["s1"])
+    routes.bind_sessions("other", ["s2"])
+
+    assert routes.recipients("output.chat.delta", "s1") == {"client"}
+    assert routes.recipients("output.chat.delta", "s2") == {"other"}
+
+
+def test_subscriptions_take_precedence_over_announcements():
+    routes = RoutingIndex()
+    routes.add_peer("module")
+    routes.announce("module", ["input.*"])
+    routes.subscribe("module", ["output.chat.*"])
+
+    assert routes.recipients("output.chat.delta", None) == {"module"}
+    assert routes.recipients("input.text", None) == set()
+    assert routes.recipients("input.text", None, inbound=True) == {"module"}